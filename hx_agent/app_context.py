@@ -34,6 +34,9 @@ def get_ctx() -> AppContext:
         file=Path(cfg.log.file),
         rotate_mb=cfg.log.rotate_mb,
         backups=cfg.log.backups,
+        async_mode=cfg.log.async_mode,
+        events_to_file=cfg.log.events_to_file,
+        events_file=Path(cfg.log.events_file),
     )
     logger = create_logger(opt, repo_root=settings.ROOT)
 
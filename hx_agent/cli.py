@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import sqlite3
+import time
 from datetime import datetime
 import typer
 
 # 配置文件和日志的头文件
 from hx_agent.app_context import get_ctx, ensure_default_config, settings, Path
+from hx_agent.core.logger import ProgressReporter
 
 from hx_agent.ingest.scanner import iter_docs, file_sha256
 
@@ -15,25 +17,43 @@ from hx_agent.index.meta_store import (
     delete_chunks_for_file,
     insert_chunks_and_fts,
     get_chunk,
-    stats
+    stats,
+    near_dup_clusters,
+    start_run,
+    finish_run,
+    stale_file_ids,
+    use_db,
+    current_db,
 )
+from hx_agent.index.snapshot import snapshot_full, snapshot_incremental
+from hx_agent.ingest.normalizer import normalize_file
 from hx_agent.ingest.chunker_md import chunk_markdown
-from hx_agent.index.meta_store import search_fts
-import re
-
-_HTML_RE = re.compile(r"<[^>]+>")
+from hx_agent.rag.retriever import retrieve, FtsRetriever
+from hx_agent.rag.answerer import Answerer
+from hx_agent.rag.llm_backend import OpenAICompatBackend, ResponseCache
+from hx_agent.format.reformatter import reformat_path
 
 # 用于测试
 app = typer.Typer(add_completion=False)
 
 
+@app.callback()
+def main(
+    db: str = typer.Option(None, "--db", help="使用指定的库（默认 kb.sqlite）"),
+    readonly: bool = typer.Option(False, "--readonly", help="只读副本模式：immutable URI + mmap"),
+):
+    """hx-agent：SQLite-first 文档整理与知识库 CLI。"""
+    path = Path(db).resolve() if db else settings.KB_DB.resolve()
+    # immutable 连接假定文件不会被改；正在被 ingest 写的主库不满足，只能用于 snapshot 出来的副本
+    if readonly and path == settings.KB_DB.resolve():
+        raise RuntimeError(f"--readonly 只能用于快照副本，不能用于主库: {path}（请同时指定 --db）")
+    use_db(path, readonly=readonly)
+
+
 def _ensure_dirs():
     settings.OUT_DIR.mkdir(parents=True, exist_ok=True)
     settings.CACHE_DIR.mkdir(parents=True, exist_ok=True)
     
-def strip_html(s: str) -> str:
-    return _HTML_RE.sub("", s).strip()
-    
 
 # 初始化配置文件的调试
 @app.command("init-config")
@@ -56,11 +76,18 @@ def doctor():
     ctx = get_ctx()
     ctx.logger.info("[bold green]OK[/bold green] hx-agent doctor")
     ctx.logger.info(f"ROOT: {settings.ROOT}")
-    ctx.logger.info(f"KB_DB: {settings.KB_DB}")
+    ctx.logger.info(f"KB_DB: {current_db()}")
     ctx.logger.info(f"SCHEMA_SQL: {settings.SCHEMA_SQL}")
     ctx.logger.info(f"OUT_DIR: {settings.OUT_DIR}")
     ctx.logger.info(f"CACHE_DIR: {settings.CACHE_DIR}")
     ctx.logger.info(f"CHUNK_POLICY_VERSION: {settings.CHUNK_POLICY_VERSION}")
+
+    clusters = near_dup_clusters(limit=10)
+    print(f"NEAR-DUP CLUSTERS: {len(clusters)}")
+    for i, cl in enumerate(clusters, start=1):
+        print(f"[{i}] size={len(cl)}")
+        for m in cl:
+            print(f"    {m['path']}#L{m['start']}-L{m['end']}  id={m['chunk_id']}")
     
 
 # 初始化数据库
@@ -70,19 +97,21 @@ def init_db():
     _ensure_dirs()
 
     
+    db = current_db()
     print("[bold]Init DB[/bold]")
     print(f"schema: {settings.SCHEMA_SQL}")
-    print(f"db:     {settings.KB_DB}")
+    print(f"db:     {db}")
     
     if not settings.SCHEMA_SQL.exists():
         raise RuntimeError(f"schema.sql not found: {settings.SCHEMA_SQL}")
 
     sql = settings.SCHEMA_SQL.read_text(encoding="utf-8")
-    with sqlite3.connect(settings.KB_DB) as conn:
+    with sqlite3.connect(db) as conn:
         conn.executescript(sql)
+        conn.execute("PRAGMA journal_mode = WAL;")  # 持久化在库文件里，snapshot 读库时 ingest 照常提交
         conn.commit()
 
-    print(f"[bold green]DB initialized[/bold green]: {settings.KB_DB}")
+    print(f"[bold green]DB initialized[/bold green]: {db}")
     print(f"at {datetime.now().isoformat(timespec='seconds')}")
 
 # # 扫描md和txt并插入files的表中
@@ -127,19 +156,25 @@ def ingest(path: str =  typer.Argument("data")):
     rebuilt = 0
     total_chunks = 0
 
-    for p in iter_docs(root):
+    # 先列出文件（只走目录树，不读内容），用于进度的 ETA
+    docs = list(iter_docs(root))
+    progress = ProgressReporter(ctx.logger, total=len(docs), label="ingest",
+                                interval=ctx.cfg.log.progress_interval)
+    repo_root = settings.ROOT.resolve()
+    run_id = start_run(settings.CHUNK_POLICY_VERSION)
+    # 切分规则升级、或缺近重复签名的文件，内容没变也要重切
+    stale = stale_file_ids(settings.CHUNK_POLICY_VERSION)
+
+    for p in docs:
         st = p.stat()
         sha = file_sha256(p)
 
         # 拿相对路径
-        repo_root = settings.ROOT.resolve()
         p_abs = p.resolve()
         try:
             db_path = str(p_abs.relative_to(repo_root))  # 后续应当增加为绝对路径
-            ctx.logger.info("[cli::ingest]the path is %s", db_path)
         except ValueError:
             db_path = str(p_abs)  # 不在仓库内就保留绝对路径
-            ctx.logger.info("[cli::ingest]the path is %s", db_path)
 
         file_id, changed = upsert_file_return_id(
             path=db_path,
@@ -149,11 +184,13 @@ def ingest(path: str =  typer.Argument("data")):
             ftype=p.suffix.lower().lstrip("."),
         )
         scanned += 1
+        progress.update(1, int(st.st_size))
 
-        if not changed:
+        if not changed and file_id not in stale:
+            ctx.logger.event("ingest.file", path=db_path, changed=False)
             continue
 
-        text = p.read_text(encoding="utf-8", errors="ignore")
+        text = normalize_file(p)
         ck = chunk_markdown(text)
 
         delete_chunks_for_file(file_id)
@@ -162,17 +199,21 @@ def ingest(path: str =  typer.Argument("data")):
             path=db_path,
             chunk_policy_version=settings.CHUNK_POLICY_VERSION,
             chunks=ck,
+            run_id=run_id,
         )
         rebuilt += 1
         total_chunks += n
+        ctx.logger.event("ingest.file", path=db_path, changed=True, chunks=n)
 
-    print(f"OK scanned={scanned}, rebuilt_files={rebuilt}, inserted_chunks={total_chunks}")
+    progress.finish()
+    finish_run(run_id, f"scanned={scanned}, rebuilt_files={rebuilt}, inserted_chunks={total_chunks}")
+    print(f"OK run={run_id}, scanned={scanned}, rebuilt_files={rebuilt}, inserted_chunks={total_chunks}")
 
 
 @app.command()
-def search(query: str, topk: int = 10):
-    """全文检索（FTS5）。"""
-    rows = search_fts(query, topk=topk)
+def search(query: str, topk: int = 10, dedup: bool = True):
+    """全文检索（FTS5），默认折叠近重复命中。"""
+    rows = retrieve(query, topk=topk, dedup=dedup)
     if not rows:
         print("No hits.")
         return
@@ -183,11 +224,48 @@ def search(query: str, topk: int = 10):
         print(f"    ref: {r['path']}#L{r['start']}-L{r['end']}")
         if r["heading"]:
             print(f"    heading: {r['heading']}")
+        for d in r.get("dups", []):
+            print(f"    dup: {d['path']}#L{d['start']}-L{d['end']}  id={d['chunk_id']}")
         print(f"    {r['snippet']}")
         print()
 
 
 
+@app.command()
+def ask(
+    query: str,
+    mode: str = typer.Option("summary", "--mode", help="summary|steps|compare"),
+    topk: int = typer.Option(None, "--topk", help="检索条数，默认取配置 ask.topk"),
+    llm: bool = typer.Option(False, "--llm", help="使用配置里的 LLM 后端（llm.base_url）"),
+    export: str = typer.Option(None, "--export", help="同时写入 Markdown 文件"),
+):
+    """问答：检索 + 句子级上下文打包，答案与引用边生成边输出。"""
+    ctx = get_ctx()
+    backend = None
+    if llm:
+        if not ctx.cfg.llm.base_url:
+            raise RuntimeError("llm.base_url is empty in config")
+        backend = OpenAICompatBackend(ctx.cfg.llm, ResponseCache(settings.CACHE_DIR / "llm"))
+    answerer = Answerer(FtsRetriever(), backend=backend, context_chars=ctx.cfg.ask.context_chars)
+
+    out = open(export, "w", encoding="utf-8") if export else None
+    t0 = time.perf_counter()
+    ttfo = None
+    try:
+        for piece in answerer.answer(query, mode=mode, topk=topk or ctx.cfg.ask.topk):
+            if ttfo is None:
+                ttfo = time.perf_counter() - t0
+            typer.echo(piece, nl=False)
+            if out:
+                out.write(piece)
+    finally:
+        if out:
+            out.close()
+    total = time.perf_counter() - t0
+    ctx.logger.event("ask.timing", mode=mode, llm=llm,
+                     ttfo_ms=round((ttfo or total) * 1000, 1), total_ms=round(total * 1000, 1))
+
+
 # 回看的能力
 @app.command()
 def show(chunk_id: int):
@@ -205,6 +283,51 @@ def show(chunk_id: int):
     print(text)
 
 
+@app.command()
+def reformat(
+    path: str,
+    template: str = typer.Option("sop", "--template", help="sop|debug|note"),
+    out: str = typer.Option(None, "--out", help="输出目录，默认 out/"),
+    workers: int = typer.Option(0, "--workers", help="进程数，0=CPU 数"),
+):
+    """笔记重排版：文件或目录 -> 模板化 Markdown（按源 sha256 + 模板版本缓存）。"""
+    _ensure_dirs()
+    ctx = get_ctx()
+    results = reformat_path(
+        Path(path),
+        template=template,
+        out_dir=Path(out) if out else None,
+        workers=workers,
+    )
+    done = 0
+    for r in results:
+        if not r.cached:
+            done += 1
+        ctx.logger.event("reformat.file", src=str(r.src), out=str(r.out), cached=r.cached)
+    print(f"OK files={len(results)}, reformatted={done}, cached={len(results) - done}")
+
+@app.command()
+def snapshot(
+    dest: str,
+    incremental: bool = typer.Option(False, "--incremental", help="只同步副本版本之后变更的文件"),
+    pages: int = typer.Option(256, "--pages", help="全量备份每步拷贝的页数"),
+    pause_ms: int = typer.Option(0, "--pause-ms", help="全量备份每步之间让出的毫秒数"),
+):
+    """在线快照：导出只读副本（ingest 运行中也可用）。"""
+    ctx = get_ctx()
+    dest_path = Path(dest).resolve()
+    if incremental:
+        r = snapshot_incremental(dest_path)
+    else:
+        r = snapshot_full(
+            dest_path,
+            pages=pages,
+            pause=pause_ms / 1000.0,
+            progress=lambda done, total: ctx.logger.debug("[snapshot] %d/%d pages", done, total),
+        )
+    mode = "incremental" if r.incremental else "full"
+    print(f"OK snapshot={r.dest}, mode={mode}, run={r.run_id}, files={r.files}, restarts={r.restarts}")
+
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
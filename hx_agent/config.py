@@ -14,7 +14,10 @@ class Settings:
     CACHE_DIR: Path = ROOT / "cache"
 
     # 切块策略版本（进库，用于回归）
-    CHUNK_POLICY_VERSION: str = "md_v1"
+    CHUNK_POLICY_VERSION: str = "md_v2"
+
+    # 重排版规则版本（参与 reformat 缓存 key）
+    REFORMAT_POLICY_VERSION: str = "fmt_v1"
 
     # 读取文件类型配置
     DEFAULT_FILE_TAIL: tuple[str, ...] = (".md", ".txt")
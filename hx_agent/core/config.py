@@ -11,6 +11,10 @@ class LogConfig:
     file: str = "cache/logs/hx_agent.log"
     rotate_mb: int = 5
     backups: int = 3
+    async_mode: bool = True      # QueueHandler + 后台线程写日志
+    events_to_file: bool = False # 逐文件明细写 JSONL
+    events_file: str = "cache/logs/events.jsonl"
+    progress_interval: float = 2.0  # 进度汇总间隔（秒）
 
 @dataclass
 class IngestConfig:
@@ -19,10 +23,23 @@ class IngestConfig:
 
 @dataclass
 class ChunkConfig:
-    policy_version: str = "md_v1"
+    policy_version: str = "md_v2"
     target_chars: int = 800       # 先预留（后面 chunk 用）
     overlap_chars: int = 120
 
+@dataclass
+class AskConfig:
+    context_chars: int = 3000     # 打包给回答的上下文字符预算
+    topk: int = 8
+
+@dataclass
+class LLMConfig:
+    base_url: str = ""            # OpenAI 兼容接口，如 http://127.0.0.1:8000/v1；为空则不接 LLM
+    model: str = "local"
+    api_key_env: str = "HX_LLM_API_KEY"  # 从环境变量读 key，不写进配置
+    timeout_s: float = 60.0
+    max_concurrency: int = 4
+
 @dataclass
 class AppConfig:
     # 路径尽量用相对路径（相对 repo root）
@@ -34,6 +51,8 @@ class AppConfig:
     log: LogConfig = field(default_factory=LogConfig)
     ingest: IngestConfig = field(default_factory=IngestConfig)
     chunk: ChunkConfig = field(default_factory=ChunkConfig)
+    ask: AskConfig = field(default_factory=AskConfig)
+    llm: LLMConfig = field(default_factory=LLMConfig)
 
 def default_config() -> AppConfig:
     return AppConfig()
@@ -56,7 +75,8 @@ def load_config(config_path: Path) -> AppConfig:
 
     # 子配置：log
     log = data.get("log", {})
-    for k in ["level", "to_console", "to_file", "file", "rotate_mb", "backups"]:
+    for k in ["level", "to_console", "to_file", "file", "rotate_mb", "backups",
+              "async_mode", "events_to_file", "events_file", "progress_interval"]:
         if k in log:
             setattr(cfg.log, k, log[k])
 
@@ -71,6 +91,18 @@ def load_config(config_path: Path) -> AppConfig:
         if k in chunk:
             setattr(cfg.chunk, k, chunk[k])
 
+    # ask
+    ask = data.get("ask", {})
+    for k in ["context_chars", "topk"]:
+        if k in ask:
+            setattr(cfg.ask, k, ask[k])
+
+    # llm
+    llm = data.get("llm", {})
+    for k in ["base_url", "model", "api_key_env", "timeout_s", "max_concurrency"]:
+        if k in llm:
+            setattr(cfg.llm, k, llm[k])
+
     return cfg
 
 def save_default_config(config_path: Path) -> None:
@@ -88,6 +120,10 @@ def save_default_config(config_path: Path) -> None:
             "file": cfg.log.file,
             "rotate_mb": cfg.log.rotate_mb,
             "backups": cfg.log.backups,
+            "async_mode": cfg.log.async_mode,
+            "events_to_file": cfg.log.events_to_file,
+            "events_file": cfg.log.events_file,
+            "progress_interval": cfg.log.progress_interval,
         },
         "ingest": {
             "include_exts": cfg.ingest.include_exts,
@@ -97,5 +133,16 @@ def save_default_config(config_path: Path) -> None:
             "target_chars": cfg.chunk.target_chars,
             "overlap_chars": cfg.chunk.overlap_chars,
         },
+        "ask": {
+            "context_chars": cfg.ask.context_chars,
+            "topk": cfg.ask.topk,
+        },
+        "llm": {
+            "base_url": cfg.llm.base_url,
+            "model": cfg.llm.model,
+            "api_key_env": cfg.llm.api_key_env,
+            "timeout_s": cfg.llm.timeout_s,
+            "max_concurrency": cfg.llm.max_concurrency,
+        },
     }
     config_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
\ No newline at end of file
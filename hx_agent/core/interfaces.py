@@ -0,0 +1,16 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Protocol, Sequence, Tuple
+
+# 上层（cli/answerer）只依赖这些接口；实现可以换成 C++/向量库/其他 LLM 服务
+
+class IRetriever(Protocol):
+    def retrieve(self, query: str, topk: int = 10) -> List[Dict[str, Any]]: ...
+
+class ILLMBackend(Protocol):
+    def stream(self, prompt: str) -> Iterator[str]: ...
+    async def complete(self, prompt: str) -> str: ...
+    async def complete_many(self, prompts: Sequence[str]) -> List[str]: ...
+    def iter_completed(self, prompts: Sequence[str]) -> Iterator[Tuple[int, str]]: ...
+
+class IAnswerer(Protocol):
+    def answer(self, query: str, mode: str = "summary", topk: int = 8) -> Iterator[str]: ...
@@ -1,9 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
-from typing import Optional, Protocol
+import queue
+import time
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Any, List, Optional, Protocol
 
 class ILogger(Protocol):
     def debug(self, msg: str, *args, **kwargs) -> None: ...
@@ -11,6 +15,7 @@ class ILogger(Protocol):
     def warning(self, msg: str, *args, **kwargs) -> None: ...
     def error(self, msg: str, *args, **kwargs) -> None: ...
     def exception(self, msg: str, *args, **kwargs) -> None: ...
+    def event(self, name: str, **fields: Any) -> None: ...
 
 @dataclass(frozen=True)
 class LoggerOptions:
@@ -21,11 +26,24 @@ class LoggerOptions:
     file: Path = Path("cache/logs/hx_agent.log")
     rotate_mb: int = 5
     backups: int = 3
+    # 异步模式：handler 挪到后台线程，热路径只做一次入队
+    async_mode: bool = True
+    # 结构化事件（逐文件明细）写 JSONL，默认关闭
+    events_to_file: bool = False
+    events_file: Path = Path("cache/logs/events.jsonl")
+
+class JsonlFormatter(logging.Formatter):
+    """事件 -> 一行 JSON：{"ts", "event", ...fields}"""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"ts": round(record.created, 3), "event": record.getMessage()}
+        data.update(getattr(record, "hx_fields", {}))
+        return json.dumps(data, ensure_ascii=False, default=str)
 
 class StdLogger(ILogger):
     """标准库 logging 的封装实现。未来要换实现，只要换 create_logger 返回的类即可。"""
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, events: Optional[logging.Logger] = None):
         self._logger = logger
+        self._events = events
 
     def debug(self, msg: str, *args, **kwargs) -> None: self._logger.debug(msg, *args, **kwargs)
     def info(self, msg: str, *args, **kwargs) -> None: self._logger.info(msg, *args, **kwargs)
@@ -33,12 +51,86 @@ class StdLogger(ILogger):
     def error(self, msg: str, *args, **kwargs) -> None: self._logger.error(msg, *args, **kwargs)
     def exception(self, msg: str, *args, **kwargs) -> None: self._logger.exception(msg, *args, **kwargs)
 
+    def event(self, name: str, **fields: Any) -> None:
+        """
+        结构化事件（逐文件明细等）。
+        开了 JSONL sink 就写 JSONL；否则只在 DEBUG 级别下落到普通日志，INFO 下几乎零开销。
+        """
+        if self._events is not None:
+            self._events.info(name, extra={"hx_fields": fields})
+        elif self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("%s %s", name, fields)
+
+class ProgressReporter:
+    """
+    限频进度汇总：代替逐文件的 INFO 行。
+    update() 只做计数 + 一次时钟比较，到了间隔才格式化输出 files/s、MB/s、ETA。
+    """
+    def __init__(self, logger: ILogger, total: Optional[int] = None,
+                 label: str = "progress", interval: float = 2.0):
+        self._logger = logger
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self._t0 = time.monotonic()
+        self._last = self._t0
+
+    def update(self, files: int = 1, nbytes: int = 0) -> None:
+        self.files += files
+        self.bytes += nbytes
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._logger.info("[%s] %s", self.label, self.summary(now))
+
+    def summary(self, now: Optional[float] = None) -> str:
+        elapsed = max((now or time.monotonic()) - self._t0, 1e-9)
+        fps = self.files / elapsed
+        mbps = self.bytes / elapsed / (1024 * 1024)
+        s = f"files={self.files}"
+        if self.total:
+            s += f"/{self.total}"
+        s += f" {fps:.1f} files/s {mbps:.2f} MB/s elapsed={elapsed:.1f}s"
+        if self.total and fps > 0:
+            s += f" eta={max(self.total - self.files, 0) / fps:.1f}s"
+        return s
+
+    def finish(self) -> str:
+        s = self.summary()
+        self._logger.info("[%s] done %s", self.label, s)
+        return s
+
+# 所有后台日志线程；进程退出前统一停掉（停的时候会把队列里剩下的日志写完）
+_listeners: List[QueueListener] = []
+
+def _start_queue(logger: logging.Logger, handlers: List[logging.Handler]) -> None:
+    """把 handlers 挂到 QueueListener 后台线程上，logger 只保留一个 QueueHandler。"""
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(QueueHandler(q))
+    _listeners.append(listener)
+
+def flush_logs() -> None:
+    """把队列里积压的日志写完：停一下后台线程（stop 会先处理完队列）再重启。"""
+    for listener in _listeners:
+        listener.stop()
+        listener.start()
+
+@atexit.register
+def _stop_listeners() -> None:
+    while _listeners:
+        _listeners.pop().stop()
+
 def create_logger(opt: LoggerOptions, repo_root: Path) -> ILogger:
     logger = logging.getLogger(opt.name)
+    events_logger = logging.getLogger(f"{opt.name}.events")
 
     # 关键：避免重复添加 handler
     if getattr(logger, "_hx_configured", False):
-        return StdLogger(logger)
+        return StdLogger(logger, events_logger if events_logger.handlers else None)
 
     level = getattr(logging, opt.level.upper(), logging.INFO)
     logger.setLevel(level)
@@ -48,11 +140,12 @@ def create_logger(opt: LoggerOptions, repo_root: Path) -> ILogger:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
+    handlers: List[logging.Handler] = []
     if opt.to_console:
         sh = logging.StreamHandler()
         sh.setLevel(level)
         sh.setFormatter(fmt)
-        logger.addHandler(sh)
+        handlers.append(sh)
 
     if opt.to_file:
         log_path = (repo_root / opt.file).resolve()
@@ -65,7 +158,33 @@ def create_logger(opt: LoggerOptions, repo_root: Path) -> ILogger:
         )
         fh.setLevel(level)
         fh.setFormatter(fmt)
-        logger.addHandler(fh)
+        handlers.append(fh)
+
+    if opt.async_mode and handlers:
+        _start_queue(logger, handlers)
+    else:
+        for h in handlers:
+            logger.addHandler(h)
+
+    events: Optional[logging.Logger] = None
+    if opt.events_to_file:
+        ev_path = (repo_root / opt.events_file).resolve()
+        ev_path.parent.mkdir(parents=True, exist_ok=True)
+        # 逐文件明细量大，和主日志一样按大小轮转
+        eh = RotatingFileHandler(
+            ev_path,
+            maxBytes=opt.rotate_mb * 1024 * 1024,
+            backupCount=opt.backups,
+            encoding="utf-8",
+        )
+        eh.setFormatter(JsonlFormatter())
+        events_logger.setLevel(logging.INFO)
+        events_logger.propagate = False  # 事件不进普通日志
+        if opt.async_mode:
+            _start_queue(events_logger, [eh])
+        else:
+            events_logger.addHandler(eh)
+        events = events_logger
 
     logger._hx_configured = True  # 标记，防止重复配置
-    return StdLogger(logger)
\ No newline at end of file
+    return StdLogger(logger, events)
@@ -0,0 +1,232 @@
+# 笔记重排版模块：把凌乱笔记套进 sop/debug/note 模板
+
+from __future__ import annotations
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from hx_agent.config import settings
+from hx_agent.ingest.scanner import iter_docs, file_sha256
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+TEMPLATES: Tuple[str, ...] = ("sop", "debug", "note")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+_HTML_RE = re.compile(r"<[^>]+>")
+_SLOT_RE = re.compile(r"\{\{(\w+)\}\}")
+
+EMPTY_SLOT = "（待补充）"
+
+# 原文标题里出现这些关键词，就把该段落归到对应的模板槽位
+SLOT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "background": ("背景", "概述", "简介", "background"),
+    "goal": ("目标", "goal"),
+    "steps": ("步骤", "流程", "操作", "step"),
+    "validation": ("验证", "检查", "测试", "verify"),
+    "verify": ("验证", "回归", "测试", "verify"),
+    "risks": ("风险", "注意", "risk"),
+    "rollback": ("回滚", "rollback"),
+    "refs": ("参考", "链接", "ref"),
+    "symptom": ("现象", "问题", "symptom"),
+    "env": ("环境", "env"),
+    "trace": ("排查", "分析", "trace"),
+    "root_cause": ("根因", "原因", "cause"),
+    "fix": ("修复", "解决", "fix"),
+    "todo": ("待办", "遗留", "todo"),
+    "points": ("要点", "特性", "总结", "point"),
+    "examples": ("例子", "示例", "example"),
+}
+
+@dataclass
+class ReformatResult:
+    src: Path
+    out: Path
+    cached: bool
+
+def load_template(name: str) -> str:
+    if name not in TEMPLATES:
+        raise RuntimeError(f"unknown template: {name} (choose from {'/'.join(TEMPLATES)})")
+    return (TEMPLATE_DIR / f"{name}.md").read_text(encoding="utf-8")
+
+def template_version(name: str) -> str:
+    """模板版本 = 重排规则版本 + 模板内容 hash；任一变化都会让缓存失效。"""
+    h = hashlib.sha256(load_template(name).encode("utf-8")).hexdigest()[:12]
+    return f"{settings.REFORMAT_POLICY_VERSION}-{h}"
+
+def cache_key(src_sha256: str, template: str, version: str) -> str:
+    return hashlib.sha256(f"{src_sha256}|{template}|{version}".encode("utf-8")).hexdigest()
+
+# 槽位正文超过这个大小就落到临时文件，不常驻内存
+SLOT_SPOOL_CHARS = 1024 * 1024
+
+class _SlotBody:
+    """
+    一个槽位的正文，边扫边写进 SpooledTemporaryFile。
+    写出的内容等价于 "\n".join(lines).strip()：开头的空白行/空白直接丢掉，
+    行尾空白和空白行先挂在 gap 里，等下一行有内容时才写出（结尾的自然就丢了）。
+    """
+    def __init__(self):
+        self.f = tempfile.SpooledTemporaryFile(max_size=SLOT_SPOOL_CHARS, mode="w+", encoding="utf-8", newline="")
+        self.n = 0
+        self.gap = ""
+
+    def add(self, line: str) -> None:
+        body = line.rstrip()
+        if not body:
+            if self.n:
+                self.gap += "\n" + line
+            return
+        if self.n:
+            self.f.write(self.gap + "\n" + body)
+        else:
+            self.f.write(body.lstrip())
+        self.n += 1
+        self.gap = line[len(body):]
+
+    def copy_to(self, w) -> None:
+        self.f.seek(0)
+        shutil.copyfileobj(self.f, w)
+
+    def close(self) -> None:
+        self.f.close()
+
+def _scan_sections(src: Path, slots: List[str]) -> Tuple[str, Dict[str, _SlotBody]]:
+    """
+    流式扫一遍原文（逐行读，不整份载入）：
+    - 第一个标题作为 title
+    - 标题命中关键词的段落写进对应槽位的临时文件（大段落也不进内存）
+    """
+    title = ""
+    sections: Dict[str, _SlotBody] = {}
+    current: Optional[str] = None
+    in_code = False
+
+    with src.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            s = line.strip()
+            if s.startswith("```") or s.startswith("~~~"):
+                in_code = not in_code
+            elif not in_code:
+                m = _HEADING_RE.match(s)
+                if m:
+                    text = _HTML_RE.sub("", m.group(2)).strip()
+                    if not title:
+                        title = text
+                    low = text.lower()
+                    current = next(
+                        (k for k in slots if any(w in low for w in SLOT_KEYWORDS.get(k, ()))),
+                        None,
+                    )
+                    continue
+            if current is not None:
+                if current not in sections:
+                    sections[current] = _SlotBody()
+                sections[current].add(line.rstrip("\n"))
+
+    return title or src.stem, sections
+
+def _render(w, text: str, title: str, sections: Dict[str, _SlotBody]) -> None:
+    """模板片段按 {{slot}} 切开，字面部分直接写，槽位正文从临时文件流拷贝"""
+    parts = _SLOT_RE.split(text)
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            w.write(part)
+        elif part == "title":
+            w.write(title)
+        elif part in sections and sections[part].n:
+            sections[part].copy_to(w)
+        else:
+            w.write(EMPTY_SLOT)
+
+def reformat_file(src: Path, template: str, out_path: Path) -> Path:
+    """把单个文件按模板重排写到 out_path。槽位正文和原文（{{raw}}）都是流式拷贝。"""
+    tpl = load_template(template)
+    head, _, tail = tpl.partition("{{raw}}")
+    slots = [k for k in _SLOT_RE.findall(head) if k != "title"]
+    title, sections = _scan_sections(src, slots)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8", newline="\n") as w:
+            _render(w, head, title, sections)
+            with src.open("r", encoding="utf-8", errors="ignore") as r:
+                shutil.copyfileobj(r, w)
+            _render(w, tail, title, sections)
+    finally:
+        for body in sections.values():
+            body.close()
+    os.replace(tmp, out_path)
+    return out_path
+
+def _marker_path(cache_root: Path, out_path: Path) -> Path:
+    """缓存标记按输出路径定位：一个输出文件对应一个标记"""
+    return cache_root / hashlib.sha256(str(out_path).encode("utf-8")).hexdigest()
+
+def _work(args: Tuple[Path, str, Path, Path, str]) -> Path:
+    """进程池任务：重排 + 写缓存标记（标记里存生成该输出的 key）"""
+    src, template, out_path, marker, key = args
+    reformat_file(src, template, out_path)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(key, encoding="utf-8")
+    return out_path
+
+def reformat_path(
+    path: Path,
+    template: str = "sop",
+    out_dir: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    workers: int = 0,
+) -> List[ReformatResult]:
+    """
+    重排单个文件或整个目录：
+    - 输出：out_dir/<相对路径>.<template>.md
+    - 缓存：cache_dir/reformat/<sha256(输出路径)>，内容是 sha256(源sha|模板名|模板版本)；
+      标记里的 key 与当前 key 相同且输出还在才算命中
+    - 未命中的文件丢进进程池（workers<=0 用 CPU 数；只有 1 个时直接在本进程跑）
+    """
+    path = path.resolve()
+    out_dir = (out_dir or settings.OUT_DIR).resolve()
+    cache_root = (cache_dir or settings.CACHE_DIR).resolve() / "reformat"
+    version = template_version(template)
+
+    if path.is_dir():
+        # 输出目录在待重排目录里面时（如 reformat . 配默认 out/），别把上次的输出又当成输入
+        skip = out_dir if out_dir != path and out_dir.is_relative_to(path) else None
+        srcs = [
+            (p, p.relative_to(path))
+            for p in iter_docs(path)
+            if skip is None or not p.is_relative_to(skip)
+        ]
+    elif path.is_file():
+        srcs = [(path, Path(path.name))]
+    else:
+        raise RuntimeError(f"path not found: {path}")
+
+    results: List[ReformatResult] = []
+    todo: List[Tuple[Path, str, Path, Path, str]] = []
+    for src, rel in srcs:
+        out_path = out_dir / rel.with_name(f"{rel.stem}.{template}.md")
+        key = cache_key(file_sha256(src), template, version)
+        marker = _marker_path(cache_root, out_path)
+        if out_path.exists() and marker.exists() and marker.read_text(encoding="utf-8") == key:
+            results.append(ReformatResult(src, out_path, cached=True))
+            continue
+        todo.append((src, template, out_path, marker, key))
+
+    if len(todo) <= 1 or workers == 1:
+        outs = [_work(t) for t in todo]
+    else:
+        n = workers if workers > 0 else (os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=min(n, len(todo))) as ex:
+            outs = list(ex.map(_work, todo, chunksize=max(1, len(todo) // (n * 4))))
+
+    for t, out_path in zip(todo, outs):
+        results.append(ReformatResult(t[0], out_path, cached=False))
+    return results
@@ -2,21 +2,55 @@ from __future__ import annotations
 import sqlite3
 from pathlib import Path
 import hashlib
-from typing import Iterable, Optional, Tuple, List, Dict, Any
+from typing import Iterable, Optional, Tuple, List, Dict, Any, Set
 
 from hx_agent.app_context import settings, get_ctx
+from hx_agent.index.near_dup import simhash_batch, band_keys, bucket_pairs, cluster_pairs
 
 meta_log =  get_ctx()
 
+# 只读副本冷读：整库 mmap，省掉 read() 拷贝
+MMAP_SIZE = 256 * 1024 * 1024
+
+# 当前使用的库；cli 的 --db/--readonly 通过 use_db() 切换
+_db_path: Path = Path(settings.KB_DB)
+_readonly: bool = False
+
+def use_db(path: Path, readonly: bool = False) -> None:
+    """切换 connect() 使用的库（例如只读副本）。"""
+    global _db_path, _readonly
+    _db_path = Path(path)
+    _readonly = readonly
+
+def current_db() -> Path:
+    """connect() 当前指向的库"""
+    return _db_path
+
+def connect_readonly(db_path: Path) -> sqlite3.Connection:
+    """
+    只读副本连接：immutable URI（不加锁、不查 WAL/journal）+ mmap。
+    前提：连接期间文件不会被改写 —— snapshot 总是写临时文件再整体替换，满足这一点。
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    conn.execute("PRAGMA query_only = ON;")
+    return conn
+
 def connect() -> sqlite3.Connection:
     """连接到知识库 SQLite 数据库。"""
-    db_path = Path(settings.KB_DB)
+    db_path = _db_path
     if(not db_path.exists()):
         meta_log.logger.error("detalib is Not exist!")
         raise RuntimeError(f"知识库数据库不存在: {db_path}")
-    conn = sqlite3.connect(settings.KB_DB)
+    if _readonly:
+        return connect_readonly(db_path)
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row 
     conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL：读事务（snapshot 的备份）不挡 ingest 提交；库已是 WAL 时这句是空操作，老库第一次连上时切过去
+    conn.execute("PRAGMA journal_mode = WAL;")
     return conn
 
 def get_file_by_path(path: str) -> Optional[Tuple[int, str]]:
@@ -66,11 +100,25 @@ def _hash_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
 
 
-# 这里是不是可以直接用SELECT id...存到列表当中去再删
+def delete_fts_for_file(conn: sqlite3.Connection, file_id: int) -> None:
+    """
+    chunks_fts 是 contentless 表，不能直接 DELETE；
+    要用 'delete' 命令并带上当初写入的原值（text/path/heading 都从 chunks/files 取回）。
+    """
+    conn.execute(
+        """
+        INSERT INTO chunks_fts(chunks_fts, rowid, text, path, heading)
+        SELECT 'delete', c.id, c.text, f.path, COALESCE(c.heading, '')
+        FROM chunks c JOIN files f ON f.id = c.file_id
+        WHERE c.file_id=?
+        """,
+        (file_id,),
+    )
+
 def delete_chunks_for_file(file_id: int) -> None:
     """先删 FTS，再删 chunks（避免失去 rowid 对应）"""
     with connect() as conn:
-        conn.execute("DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE file_id=?)", (file_id,))
+        delete_fts_for_file(conn, file_id)
         conn.execute("DELETE FROM chunks WHERE file_id=?", (file_id,))
         conn.commit()
 
@@ -81,11 +129,16 @@ def insert_chunks_and_fts(
     path: str,      #路径名
     chunk_policy_version: str, # 切块的版本
     chunks: List[Dict[str, Any]], # 总共切了多少块
+    run_id: Optional[int] = None,  # 本次 ingest 的 run；给了就在同一事务里记 file_runs
     ) -> int:
     """
     chunks: [{'heading': str, 'start_line': int, 'end_line': int, 'text': str}, ...]
     返回插入 chunk 数量
+    file_runs 和 chunks 同一个事务提交：中途被打断时不会出现“chunk 是新的、run 还是旧的”，
+    否则增量快照按 run 挑文件时会永远漏掉它。
     """
+    # 整个文件的 chunk 一次性批量算 SimHash
+    sims = simhash_batch([c["text"] for c in chunks])
     with connect() as conn:
         inserted = 0
         for idx, c in enumerate(chunks):
@@ -109,15 +162,27 @@ def insert_chunks_and_fts(
                 "INSERT OR REPLACE INTO chunks_fts(rowid, text, path, heading) VALUES(?, ?, ?, ?)",
                 (chunk_id, text, path, heading),
             )
+
+            # 近重复签名 + LSH 分桶（删 chunk 时由外键级联删除）
+            conn.execute("INSERT INTO chunk_sig(chunk_id, simhash) VALUES(?, ?)", (chunk_id, sims[idx]))
+            conn.executemany(
+                "INSERT INTO chunk_lsh(band, bucket, chunk_id) VALUES(?, ?, ?)",
+                [(band, bucket, chunk_id) for band, bucket in band_keys(sims[idx])],
+            )
             inserted += 1
 
+        if run_id is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_runs(file_id, run_id) VALUES(?, ?)",
+                (int(file_id), int(run_id)),
+            )
         conn.commit()
     return inserted
 
 
 def search_fts(query: str, topk: int = 10):
     """
-    返回: [{'chunk_id', 'path', 'heading', 'snippet', 'score'}...]
+    返回: [{'chunk_id', 'path', 'heading', 'snippet', 'score', 'simhash'}...]
     bm25 越小越相关（FTS5）
     """
     with connect() as conn:
@@ -130,10 +195,12 @@ def search_fts(query: str, topk: int = 10):
               c.start_offset AS start_line,
               c.end_offset   AS end_line,
               substr(c.text, 1, 220) AS snip,
-              bm25(chunks_fts) AS score
+              bm25(chunks_fts) AS score,
+              sig.simhash AS simhash
             FROM chunks_fts
             JOIN chunks c ON c.id = chunks_fts.rowid
             JOIN files  f ON f.id = c.file_id
+            LEFT JOIN chunk_sig sig ON sig.chunk_id = c.id
             WHERE chunks_fts MATCH ?
             ORDER BY score
             LIMIT ?
@@ -152,10 +219,46 @@ def search_fts(query: str, topk: int = 10):
                 "end": int(r["end_line"] or 0),
                 "snippet": (r["snip"] or "").replace("\n"," "),
                 "score": float(r["score"]),
+                "simhash": r["simhash"],
             }
         )
     return out
 
+def stale_file_ids(chunk_policy_version: str) -> Set[int]:
+    """
+    内容没变也要重建的文件：
+    - chunk 切分规则版本与当前不一致
+    - 有 chunk 缺 SimHash 签名（签名表是后加的，老库 init-db 之后是空的）
+    """
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT c.file_id
+            FROM chunks c LEFT JOIN chunk_sig s ON s.chunk_id = c.id
+            WHERE c.chunk_policy_version != ? OR s.chunk_id IS NULL
+            """,
+            (chunk_policy_version,),
+        ).fetchall()
+    return {int(r[0]) for r in rows}
+
+def start_run(chunk_policy_version: str) -> int:
+    """登记一次 ingest，返回 run_id"""
+    with connect() as conn:
+        cur = conn.execute(
+            "INSERT INTO runs(started_at, chunk_policy_version) VALUES(datetime('now'), ?)",
+            (chunk_policy_version,),
+        )
+        conn.commit()
+        return int(cur.lastrowid)
+
+def finish_run(run_id: int, notes: str = "") -> None:
+    with connect() as conn:
+        conn.execute(
+            "UPDATE runs SET finished_at=datetime('now'), notes=? WHERE id=?",
+            (notes, int(run_id)),
+        )
+        conn.commit()
+
 def count_files()-> int:
     """统计 files 表中的记录数"""
     with connect() as conn:
@@ -177,9 +280,84 @@ def get_chunk(chunk_id: int):
     return row
 
 
+def get_chunk_texts(chunk_ids: List[int]) -> Dict[int, str]:
+    """批量取 chunk 全文：{chunk_id: text}"""
+    if not chunk_ids:
+        return {}
+    q = ",".join("?" * len(chunk_ids))
+    with connect() as conn:
+        rows = conn.execute(f"SELECT id, text FROM chunks WHERE id IN ({q})", [int(i) for i in chunk_ids]).fetchall()
+    return {int(r[0]): str(r[1]) for r in rows}
+
+
 def stats():
     with connect() as conn:
         files = conn.execute("select count(*) from files").fetchone()[0]
         chunks = conn.execute("select count(*) from chunks").fetchone()[0]
         fts = conn.execute("select count(*) from chunks_fts").fetchone()[0]
-    return files, chunks, fts
\ No newline at end of file
+    return files, chunks, fts
+
+
+def near_dup_clusters(limit: int = 10, max_bucket: int = 200):
+    """
+    近重复簇（doctor 用）：
+    1. simhash 完全相同的先按 GROUP BY 成组，每组只留 id 最小的一条当代表
+    2. 代表之间：LSH 同桶出候选对 -> 汉明距离校验（超大桶只和代表比，见 bucket_pairs）
+    3. 并查集把完全相同的组和近重复对合成簇
+    返回: [[{'chunk_id', 'path', 'heading', 'start', 'end'}...], ...]，按簇大小降序
+    """
+    with connect() as conn:
+        groups = conn.execute(
+            "SELECT simhash, MIN(chunk_id) FROM chunk_sig GROUP BY simhash"
+        ).fetchall()
+        rep_sig = {int(cid): int(sh) for sh, cid in groups}
+
+        # 完全相同：组里每条都连到代表上
+        pairs = set()
+        exact = conn.execute(
+            """
+            SELECT simhash, chunk_id FROM chunk_sig
+            WHERE simhash IN (SELECT simhash FROM chunk_sig GROUP BY simhash HAVING COUNT(*) > 1)
+            ORDER BY simhash, chunk_id
+            """
+        ).fetchall()
+        rep = {}
+        for sh, cid in exact:
+            first = rep.setdefault(sh, int(cid))
+            if first != cid:
+                pairs.add((first, int(cid)))
+
+        rows = conn.execute(
+            """
+            SELECT l.band, l.bucket, l.chunk_id
+            FROM chunk_lsh l
+            JOIN (SELECT MIN(chunk_id) AS id FROM chunk_sig GROUP BY simhash) r ON r.id = l.chunk_id
+            ORDER BY l.band, l.bucket, l.chunk_id
+            """
+        ).fetchall()
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for band, bucket, cid in rows:
+            buckets.setdefault((band, bucket), []).append(int(cid))
+        pairs |= bucket_pairs(buckets.values(), rep_sig, max_bucket)
+
+        members = sorted({x for p in pairs for x in p})
+        clusters = cluster_pairs(members, pairs)[:limit]
+
+        out = []
+        for cl in clusters:
+            q = ",".join("?" * len(cl))
+            refs = conn.execute(
+                f"""
+                SELECT c.id, f.path, c.heading, c.start_offset, c.end_offset
+                FROM chunks c JOIN files f ON f.id = c.file_id
+                WHERE c.id IN ({q})
+                ORDER BY f.path, c.start_offset
+                """,
+                cl,
+            ).fetchall()
+            out.append([
+                {"chunk_id": int(r[0]), "path": str(r[1]), "heading": str(r[2] or ""),
+                 "start": int(r[3] or 0), "end": int(r[4] or 0)}
+                for r in refs
+            ])
+    return out
@@ -0,0 +1,137 @@
+# 近重复检测：64 位 SimHash + 分段 LSH（4 段 x 16 位）
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+SIMHASH_BITS = 64
+LSH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // LSH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+# 汉明距离 <= 3 视为近重复；4 段分桶时按鸽巢原理至少有一段完全相同，LSH 不会漏
+MAX_HAMMING = 3
+
+SHINGLE = 3  # 字符 3-gram，中英文通用，不依赖分词
+
+_P1 = np.uint64(0x9E3779B97F4A7C15)
+_P2 = np.uint64(0xC2B2AE3D27D4EB4F)
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 终混（向量化），保证 hash 跨进程稳定（不用内置 hash()）"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """text -> 每个字符 3-gram 的 64 位 hash（uint64 数组）"""
+    cps = np.frombuffer("".join(text.split()).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if cps.size == 0:
+        return cps
+    if cps.size < SHINGLE:
+        cps = np.concatenate([cps, np.zeros(SHINGLE - cps.size, dtype=np.uint64)])
+    with np.errstate(over="ignore"):
+        h = cps[:-2] * _P1 + cps[1:-1] * _P2 + cps[2:]
+        return _mix64(h)
+
+def simhash_batch(texts: Sequence[str]) -> List[int]:
+    """
+    批量计算 SimHash，返回有符号 int64（直接写 SQLite INTEGER）。
+    所有 chunk 的 3-gram 拼成一个数组，每一位用 reduceat 按 chunk 分段投票。
+    """
+    if not texts:
+        return []
+    parts = [_shingle_hashes(t) for t in texts]
+    lens = np.array([p.size for p in parts], dtype=np.int64)
+    out = np.zeros(len(texts), dtype=np.uint64)
+    nonempty = lens > 0
+    if nonempty.any():
+        allh = np.concatenate([p for p in parts if p.size])
+        seg_lens = lens[nonempty]
+        starts = np.concatenate([[0], np.cumsum(seg_lens)[:-1]])
+        fp = np.zeros(seg_lens.size, dtype=np.uint64)
+        # 逐位投票（64 次向量运算），内存只占 O(3-gram 数)，大文件也不会展开成 N x 64 矩阵
+        for b in range(SIMHASH_BITS):
+            ones = np.add.reduceat(((allh >> _BIT_SHIFTS[b]) & np.uint64(1)).astype(np.int64), starts)
+            fp |= (2 * ones > seg_lens).astype(np.uint64) << _BIT_SHIFTS[b]
+        out[nonempty] = fp
+    return [int(v) for v in out.view(np.int64)]
+
+def band_keys(simhash: int) -> List[Tuple[int, int]]:
+    """simhash -> [(band, bucket), ...]"""
+    u = simhash & ((1 << SIMHASH_BITS) - 1)
+    return [(b, (u >> (b * BAND_BITS)) & BAND_MASK) for b in range(LSH_BANDS)]
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & ((1 << SIMHASH_BITS) - 1)).bit_count()
+
+def collapse_near_dups(hits: Iterable[Dict], key: str = "simhash") -> List[Dict]:
+    """
+    按顺序折叠近重复命中：保留先出现（分数更好）的那条，后面的挂到它的 "dups" 里。
+    每条命中只查 LSH_BANDS 个桶，与结果列表长度无关。
+    """
+    buckets: Dict[Tuple[int, int], List[Dict]] = {}
+    out: List[Dict] = []
+    for h in hits:
+        sig = h.get(key)
+        if sig is None:
+            out.append(h)
+            continue
+        keys = band_keys(sig)
+        rep = None
+        for k in keys:
+            for cand in buckets.get(k, ()):
+                if hamming(sig, cand[key]) <= MAX_HAMMING:
+                    rep = cand
+                    break
+            if rep is not None:
+                break
+        if rep is not None:
+            rep.setdefault("dups", []).append(h)
+            continue
+        for k in keys:
+            buckets.setdefault(k, []).append(h)
+        out.append(h)
+    return out
+
+def bucket_pairs(buckets: Iterable[Sequence[int]], sig: Dict[int, int],
+                 max_bucket: int = 200) -> Set[Tuple[int, int]]:
+    """
+    LSH 桶 -> 汉明距离校验过的近重复对 (小 id, 大 id)。
+    桶不超过 max_bucket 时两两比较；超大的桶（大量模板块）只和桶里第一个代表比，
+    候选对从平方降到线性，但大簇本身不会丢。
+    """
+    pairs: Set[Tuple[int, int]] = set()
+    for ids in buckets:
+        if len(ids) < 2:
+            continue
+        heads = ids if len(ids) <= max_bucket else ids[:1]
+        for i, a in enumerate(heads):
+            sa = sig[a]
+            for b in ids[i + 1:]:
+                if hamming(sa, sig[b]) <= MAX_HAMMING:
+                    pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+def cluster_pairs(ids: Sequence[int], pairs: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """并查集：近重复对 -> 簇（按大小降序，只返回 size>=2 的簇）"""
+    parent = {i: i for i in ids}
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    groups: Dict[int, List[int]] = {}
+    for i in ids:
+        groups.setdefault(find(i), []).append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
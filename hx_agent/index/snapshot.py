@@ -0,0 +1,195 @@
+# 在线快照：ingest 运行中也能把 kb.sqlite 导出成只读副本
+
+from __future__ import annotations
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from hx_agent.index.meta_store import connect, delete_fts_for_file
+
+# 分页备份被写入打断、从头重来超过这么多次，就改成一步拷完
+MAX_RESTARTS = 3
+_SQLITE_OK = 0   # backup 进度回调的 status；BUSY/LOCKED 时没拷页，不算重来
+
+class _BackupRestarting(Exception):
+    """分页备份反复重启，中止后走单步备份"""
+
+@dataclass
+class SnapshotResult:
+    dest: Path
+    run_id: int       # 副本已同步到的 run（写在副本的 PRAGMA user_version 里）
+    incremental: bool
+    files: int        # 增量时同步的文件数；全量为 0
+    restarts: int = 0 # 全量分页备份被源库写入打断重来的次数
+
+def last_finished_run(conn: sqlite3.Connection) -> int:
+    (rid,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM runs WHERE finished_at IS NOT NULL").fetchone()
+    return int(rid)
+
+def replica_run(dest: Path) -> int:
+    """副本已同步到的 run_id"""
+    with sqlite3.connect(dest) as conn:
+        (v,) = conn.execute("PRAGMA user_version").fetchone()
+    return int(v)
+
+def _tmp_path(dest: Path) -> Path:
+    tmp = dest.with_name(dest.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    return tmp
+
+def snapshot_full(
+    dest: Path,
+    pages: int = 256,
+    pause: float = 0.0,
+    progress: Optional[Callable[[int, int], None]] = None,
+    max_restarts: int = MAX_RESTARTS,
+) -> SnapshotResult:
+    """
+    在线备份 API 分页拷贝：每步只拷 pages 页，步与步之间释放源库的读锁，
+    ingest 的写事务可以插进来（源库被改会让 backup 自动从头再来）。
+    ingest 一直在写时分页备份可能永远拷不完：成功的一步之后 remaining 没变小就是重来了，
+    重来超过 max_restarts 次就中止，改用 pages=-1 一步拷完。
+    这一步全程持有源库的读事务；源库是 WAL（connect()/init-db 会切过去），读不挡写，
+    ingest 照常提交，不会等到 busy timeout 报 database is locked —— 只是副本停在这一步开始时的版本。
+    先写 dest.tmp 再整体替换，只读副本永远看不到半个文件。
+    """
+    dest = Path(dest)
+    tmp = _tmp_path(dest)
+    src = connect()
+    try:
+        # 先取 run 再拷：之后结束的 run 下次增量会再同步一遍（幂等）
+        upto = last_finished_run(src)
+        dst = sqlite3.connect(tmp)
+        restarts = 0
+        last = -1
+        try:
+            def _step(status: int, remaining: int, total: int) -> None:
+                nonlocal restarts, last
+                if status == _SQLITE_OK and 0 <= last <= remaining:
+                    restarts += 1
+                    if restarts > max_restarts:
+                        raise _BackupRestarting()
+                last = remaining
+                if progress:
+                    progress(total - remaining, total)
+                if pause > 0:
+                    time.sleep(pause)
+
+            try:
+                src.backup(dst, pages=pages, progress=_step)
+            except _BackupRestarting:
+                src.backup(dst, pages=-1)
+            dst.execute("PRAGMA journal_mode = DELETE;")
+            dst.execute(f"PRAGMA user_version = {upto};")
+            dst.commit()
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(tmp, dest)
+    return SnapshotResult(dest, upto, incremental=False, files=0, restarts=restarts)
+
+def _apply_file(src: sqlite3.Connection, dst: sqlite3.Connection, file_id: int) -> None:
+    """把源库里一个文件的 files/chunks/签名/FTS 行同步到副本（先删后插）"""
+    # 单个文件一个短读事务，保证 files 与 chunks 一致，又不长时间占锁
+    src.execute("BEGIN")
+    try:
+        frow = src.execute(
+            "SELECT id, path, mtime, sha256, size, type, created_at, updated_at FROM files WHERE id=?",
+            (file_id,),
+        ).fetchone()
+        chunks = src.execute(
+            """
+            SELECT id, file_id, chunk_index, heading, start_offset, end_offset, text, text_hash, chunk_policy_version
+            FROM chunks WHERE file_id=? ORDER BY id
+            """,
+            (file_id,),
+        ).fetchall()
+        sigs = src.execute(
+            "SELECT s.chunk_id, s.simhash FROM chunk_sig s JOIN chunks c ON c.id = s.chunk_id WHERE c.file_id=?",
+            (file_id,),
+        ).fetchall()
+        lsh = src.execute(
+            "SELECT l.band, l.bucket, l.chunk_id FROM chunk_lsh l JOIN chunks c ON c.id = l.chunk_id WHERE c.file_id=?",
+            (file_id,),
+        ).fetchall()
+        run = src.execute("SELECT run_id FROM file_runs WHERE file_id=?", (file_id,)).fetchone()
+    finally:
+        src.rollback()
+
+    # 副本：旧 FTS -> 旧 chunks（签名/LSH 级联删除）
+    delete_fts_for_file(dst, file_id)
+    dst.execute("DELETE FROM chunks WHERE file_id=?", (file_id,))
+    if frow is None:
+        dst.execute("DELETE FROM files WHERE id=?", (file_id,))
+        return
+
+    dst.execute(
+        """
+        INSERT INTO files(id, path, mtime, sha256, size, type, created_at, updated_at)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            path=excluded.path, mtime=excluded.mtime, sha256=excluded.sha256, size=excluded.size,
+            type=excluded.type, created_at=excluded.created_at, updated_at=excluded.updated_at
+        """,
+        tuple(frow),
+    )
+    dst.executemany(
+        """
+        INSERT INTO chunks(id, file_id, chunk_index, heading, start_offset, end_offset, text, text_hash, chunk_policy_version)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [tuple(r) for r in chunks],
+    )
+    dst.executemany("INSERT INTO chunk_sig(chunk_id, simhash) VALUES(?, ?)", [tuple(r) for r in sigs])
+    dst.executemany("INSERT INTO chunk_lsh(band, bucket, chunk_id) VALUES(?, ?, ?)", [tuple(r) for r in lsh])
+    dst.executemany(
+        "INSERT INTO chunks_fts(rowid, text, path, heading) VALUES(?, ?, ?, ?)",
+        [(r[0], r[6], frow[1], r[3] or "") for r in chunks],
+    )
+    if run is not None:
+        dst.execute("INSERT OR REPLACE INTO file_runs(file_id, run_id) VALUES(?, ?)", (file_id, run[0]))
+
+def snapshot_incremental(dest: Path) -> SnapshotResult:
+    """
+    增量快照：只同步 file_runs.run_id 大于副本 user_version 的文件。
+    在副本的本地拷贝上应用再整体替换（副本可能正被 immutable 连接读着，不能原地改）。
+    副本不存在时退化为全量。
+    """
+    dest = Path(dest)
+    if not dest.exists():
+        return snapshot_full(dest)
+
+    since = replica_run(dest)
+    tmp = _tmp_path(dest)
+    shutil.copyfile(dest, tmp)
+
+    src = connect()
+    dst = sqlite3.connect(tmp)
+    try:
+        dst.execute("PRAGMA foreign_keys = ON;")
+        upto = last_finished_run(src)
+        changed = [
+            int(r[0])
+            for r in src.execute("SELECT file_id FROM file_runs WHERE run_id > ? ORDER BY file_id", (since,))
+        ]
+        for fid in changed:
+            _apply_file(src, dst, fid)
+
+        runs = src.execute(
+            "SELECT id, started_at, finished_at, chunk_policy_version, notes FROM runs WHERE id > ?",
+            (since,),
+        ).fetchall()
+        dst.executemany("INSERT OR REPLACE INTO runs VALUES(?, ?, ?, ?, ?)", [tuple(r) for r in runs])
+        dst.execute(f"PRAGMA user_version = {upto};")
+        dst.commit()
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, dest)
+    return SnapshotResult(dest, upto, incremental=True, files=len(changed))
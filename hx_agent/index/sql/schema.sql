@@ -44,3 +44,29 @@ USING fts5(
 
 CREATE INDEX IF NOT EXISTS idx_chunks_file_id ON chunks(file_id);
 CREATE INDEX IF NOT EXISTS idx_chunks_text_hash ON chunks(text_hash);
+
+-- 近重复检测：每个 chunk 的 64 位 SimHash + 4 段 LSH 分桶（band 0..3，bucket 为该段 16 位值）
+CREATE TABLE IF NOT EXISTS chunk_sig (
+  chunk_id INTEGER PRIMARY KEY,
+  simhash INTEGER NOT NULL,
+  FOREIGN KEY(chunk_id) REFERENCES chunks(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS chunk_lsh (
+  band INTEGER NOT NULL,
+  bucket INTEGER NOT NULL,
+  chunk_id INTEGER NOT NULL,
+  FOREIGN KEY(chunk_id) REFERENCES chunks(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunk_lsh_bucket ON chunk_lsh(band, bucket);
+CREATE INDEX IF NOT EXISTS idx_chunk_lsh_chunk_id ON chunk_lsh(chunk_id);
+
+-- 每个文件最近一次被重建的 run（增量快照：只同步 run_id 大于副本版本的文件）
+CREATE TABLE IF NOT EXISTS file_runs (
+  file_id INTEGER PRIMARY KEY,
+  run_id INTEGER NOT NULL,
+  FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_file_runs_run_id ON file_runs(run_id);
@@ -1,11 +1,10 @@
 # 切md的文档模块
 
 from __future__ import annotations
-import re
 from dataclasses import dataclass
 from typing import List, Dict, Any
 
-_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+from hx_agent.ingest.parser_md import parse_blocks, HEADING
 
 @dataclass
 class Chunk:
@@ -16,80 +15,46 @@ class Chunk:
 
 def chunk_markdown(text: str) -> List[Dict[str, Any]]:
     """
-    最小可用版本：
-    - 非代码块内：遇到 #/##/### 标题就切块
-    - 代码块（``` 或 ~~~）内：不识别标题，不切
+    消费 parser_md 的 block 流（传入的 text 应先经 normalizer 标准化）：
+    - 遇到 #/##/### 标题就切块；代码块内的 # 已被 parser 当作代码，不会切
+    - 列表/表格/代码块整块进入当前 chunk，不会被切断
     - heading 使用 “H1 > H2 > H3” 的路径
     """
-    lines = text.splitlines()
     chunks: List[Chunk] = []
 
-    heading_stack: List[str] = []  # index 0..5 对应 H1..H6
+    heading_stack: List[str] = [""] * 6  # index 0..5 对应 H1..H6
     buf: List[str] = []
     buf_start = 1
-
-    in_code = False
-    fence = None  # ``` or ~~~
-
-    def current_heading() -> str:
-        hs = [h for h in heading_stack if h]
-        return " > ".join(hs)
+    last_line = 0
 
     def flush(end_line: int):
-        nonlocal buf, buf_start
+        nonlocal buf
         if not buf:
             return
         content = "\n".join(buf).strip()
         if content:
-            chunks.append(Chunk(current_heading(), buf_start, end_line, content))
+            heading = " > ".join(h for h in heading_stack if h)
+            chunks.append(Chunk(heading, buf_start, end_line, content))
         buf = []
 
-    for i, raw in enumerate(lines, start=1):
-        line = raw
-
-        # fenced code toggle
-        if line.strip().startswith("```") or line.strip().startswith("~~~"):
-            mark = line.strip()[:3]
-            if not in_code:
-                in_code = True
-                fence = mark
-            else:
-                if fence == mark:
-                    in_code = False
-                    fence = None
-            buf.append(line)
-            continue
-
-        # heading split (only when not in code)
-        if not in_code:
-            m = _HEADING_RE.match(line)
-            if m:
-                # 遇到新标题：先 flush 上一个 chunk
-                flush(i - 1)
-                buf_start = i
-
-                level = len(m.group(1))
-                title = m.group(2).strip()
-
-                # 更新 heading 栈
-                # level=1 -> index 0
-                idx = level - 1
-                while len(heading_stack) < 6:
-                    heading_stack.append("")
-                heading_stack[idx] = title
-                # 清空更深层
-                for j in range(idx + 1, 6):
-                    heading_stack[j] = ""
-
-                buf.append(line)
-                continue
+    for b in parse_blocks(text):
+        if b.kind == HEADING:
+            # 遇到新标题：先 flush 上一个 chunk
+            flush(b.start_line - 1)
+            buf_start = b.start_line
 
-        buf.append(line)
+            # 更新 heading 栈，清空更深层
+            idx = b.level - 1
+            heading_stack[idx] = b.title
+            for j in range(idx + 1, 6):
+                heading_stack[j] = ""
+        buf.extend(b.lines)
+        last_line = b.end_line
 
-    flush(len(lines))
+    flush(last_line)
 
     # 返回 dict，方便 DB 写入
     return [
         {"heading": c.heading, "start_line": c.start_line, "end_line": c.end_line, "text": c.text}
         for c in chunks
-    ]
\ No newline at end of file
+    ]
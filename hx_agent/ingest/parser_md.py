@@ -0,0 +1,97 @@
+# Markdown 轻量块解析：把文本切成 heading/list/table/code/paragraph/blank 的 token 流
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List
+
+_LIST_RE = re.compile(r"(?:[-*+]|\d+[.)])\s")
+
+HEADING = "heading"
+CODE = "code"
+LIST = "list"
+TABLE = "table"
+PARAGRAPH = "paragraph"
+BLANK = "blank"
+
+@dataclass
+class Block:
+    kind: str
+    start_line: int           # 1-based，含
+    end_line: int             # 1-based，含
+    lines: List[str] = field(default_factory=list)
+    level: int = 0            # heading 专用：1..6
+    title: str = ""           # heading 专用
+
+def _heading(line: str):
+    """'## title' -> (2, 'title')；不是标题返回 None。与原 _HEADING_RE 规则一致：# 必须顶格，后面要有空白。"""
+    n = 0
+    while n < len(line) and n < 7 and line[n] == "#":
+        n += 1
+    if n == 0 or n > 6 or n >= len(line) or not line[n].isspace():
+        return None
+    title = line[n:].strip()
+    return (n, title) if title else None
+
+def parse_blocks(text: str) -> Iterator[Block]:
+    """
+    单遍扫描，产出 Block 流：
+    - 代码块（``` 或 ~~~）整体一个 CODE block，内部不识别标题；未闭合则到文末
+    - 标题单行一个 HEADING block
+    - 相邻同类行（list/table/paragraph/blank）合并为一个 block
+    热循环里只维护 (kind, start) 两个局部变量，切换时才按行号切片生成 Block。
+    """
+    lines = text.splitlines()
+    kind = ""          # 当前正在累积的 block 类型
+    start = 0          # 当前 block 起始下标（0-based）
+    fence = ""
+
+    for i, line in enumerate(lines):
+        # 只有缩进行才 lstrip；其余判断都先看首字符，尽量不切片、不走正则
+        c = line[:1]
+        indented = c == " " or c == "\t"
+        if indented:
+            s = line.lstrip()
+            c = s[:1]
+        else:
+            s = line
+
+        if fence:
+            if c == fence[0] and s[:3] == fence:
+                yield Block(CODE, start + 1, i + 1, lines[start:i + 1])
+                kind, fence = "", ""
+            continue
+
+        if (c == "`" or c == "~") and (s[:3] == "```" or s[:3] == "~~~"):
+            if kind:
+                yield Block(kind, start + 1, i, lines[start:i])
+            kind, start, fence = CODE, i, s[:3]
+            continue
+
+        if not c:
+            k = BLANK
+        elif c == "#" and not indented:
+            h = _heading(line)
+            if h:
+                if kind:
+                    yield Block(kind, start + 1, i, lines[start:i])
+                yield Block(HEADING, i + 1, i + 1, [line], level=h[0], title=h[1])
+                kind = ""
+                continue
+            k = PARAGRAPH
+        elif c == "|":
+            k = TABLE
+        elif c in "-*+0123456789" and _LIST_RE.match(s):
+            k = LIST
+        elif indented and kind == LIST:
+            k = LIST  # 列表项下缩进的续行
+        else:
+            k = PARAGRAPH
+
+        if k != kind:
+            if kind:
+                yield Block(kind, start + 1, i, lines[start:i])
+            kind, start = k, i
+
+    if kind:
+        yield Block(kind, start + 1, len(lines), lines[start:])
@@ -0,0 +1,228 @@
+# 问答模块：检索 -> 句子级打包（固定字符预算）-> 流式输出答案 + 引用
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from hx_agent.core.interfaces import ILLMBackend, IRetriever
+from hx_agent.index.meta_store import get_chunk_texts
+
+MODES: Tuple[str, ...] = ("summary", "steps", "compare")
+
+# 中英文句末标点之后、或换行处断句
+_SENT_SPLIT_RE = re.compile(r"(?<=[。！？!?；;])|\n")
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+_LIST_MARK_RE = re.compile(r"^\s*(?:[-*+]\s+|\d+[.)、]\s*)")
+# 问句里的疑问词/虚词：在这里把一段汉字切开，剩下的片段才像文档里的词头
+_QUESTION_WORDS_RE = re.compile(r"怎么样|怎么办|怎么|怎样|如何|为什么|为何|什么|哪些|哪个|是否|有没有|吗|呢|吧|啊|的|是|和|与|或")
+
+MIN_SENT_CHARS = 6
+
+_PROMPTS = {
+    "summary": "根据下面带编号的资料，用要点列出与问题相关的结论，每条末尾标注引用编号如 [1]。不要编造资料里没有的内容。",
+    "steps": "根据下面带编号的资料，整理成按顺序执行的步骤，每步末尾标注引用编号如 [1]。不要编造资料里没有的内容。",
+    "compare": "只根据下面这一份资料，概括它对问题的观点/做法，末尾标注引用编号。",
+}
+
+# 各 mode 的小节标题：和第一段正文一起输出，首段输出时间量的是真正的内容
+_HEADERS = {"summary": "## 摘要\n", "steps": "## 步骤\n", "compare": "## 对比\n"}
+
+def _with_header(header: str, pieces: Iterator[str]) -> Iterator[str]:
+    """把标题拼到第一段正文前面；之后的正文原样转发"""
+    for piece in pieces:
+        yield header + piece
+        header = ""
+
+@dataclass
+class Source:
+    cite: int                 # 引用编号 [n]
+    chunk_id: int
+    path: str
+    heading: str
+    start: int
+    end: int
+    sentences: List[Tuple[int, str]] = field(default_factory=list)  # (句子在 chunk 内的序号, 句子)
+
+@dataclass
+class PackedContext:
+    query: str
+    mode: str
+    sources: List[Source]
+
+    def render(self) -> str:
+        """打包后的上下文文本（也是 LLM 缓存 key 的一部分）"""
+        out = []
+        for s in self.sources:
+            if not s.sentences:
+                continue
+            out.append(f"[{s.cite}] {s.path} {s.heading}".rstrip())
+            out.extend(t for _, t in sorted(s.sentences))
+            out.append("")
+        return "\n".join(out)
+
+def query_terms(query: str) -> List[str]:
+    """英文/数字按词，中文按 2-gram（单字的词保留单字）"""
+    q = query.lower()
+    terms = _WORD_RE.findall(q)
+    for run in _CJK_RUN_RE.findall(q):
+        terms.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    return list(dict.fromkeys(terms))
+
+def cjk_phrases(query: str) -> List[str]:
+    """中文片段：连续汉字按疑问词/虚词切开，有两字以上的片段就丢掉单字"""
+    pieces = [p for run in _CJK_RUN_RE.findall(query) for p in _QUESTION_WORDS_RE.split(run) if p]
+    longer = [p for p in pieces if len(p) > 1]
+    return list(dict.fromkeys(longer or pieces))
+
+def match_expr(query: str) -> str:
+    """
+    自然语言问题 -> FTS5 MATCH 表达式：每个查询词加双引号再用 OR 连起来，
+    问号、连字符等不会被当成 FTS 语法。没有可用的词时返回空串。
+    unicode61 把一整段连续汉字索引成一个词，2-gram 对不上它；中文用整段片段做前缀查询
+    （"虚假唤醒"* 命中“虚假唤醒是……”），2-gram 只留给句子打分。
+    """
+    q = query.lower()
+    words = [f'"{w}"' for w in dict.fromkeys(_WORD_RE.findall(q))]
+    return " OR ".join(words + [f'"{p}"*' for p in cjk_phrases(q)])
+
+def split_sentences(text: str) -> List[str]:
+    """chunk 文本 -> 句子；代码块、表格分隔行、标题行不参与（引用里能回到原文看）"""
+    prose = []
+    in_code = False
+    for line in text.split("\n"):
+        head = line.lstrip()[:3]
+        if head == "```" or head == "~~~":
+            in_code = not in_code
+        elif not in_code and not line.startswith("#") and not head.startswith("|-"):
+            prose.append(line)
+
+    out = []
+    for s in _SENT_SPLIT_RE.split("\n".join(prose)):
+        s = _LIST_MARK_RE.sub("", s.strip())
+        if len(s) >= MIN_SENT_CHARS:
+            out.append(s)
+    return out
+
+def score_sentences(sentences: List[str], terms: List[str], ranks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    向量化打分：每个查询词一次 np.char.count 扫完所有句子。
+    score = Σ idf(t)·log1p(count) + 覆盖率 + 检索名次先验
+    返回 (score, 是否命中任一查询词)
+    """
+    if not sentences:
+        return np.zeros(0), np.zeros(0, dtype=bool)
+    arr = np.char.lower(np.array(sentences))
+    if terms:
+        counts = np.stack([np.char.count(arr, t) for t in terms]).astype(np.float64)  # (T, S)
+        df = (counts > 0).sum(axis=1)
+        idf = np.log1p(len(sentences) / (1.0 + df))
+        tf = (idf[:, None] * np.log1p(counts)).sum(axis=0)
+        coverage = (counts > 0).mean(axis=0)
+    else:
+        tf = coverage = np.zeros(len(sentences))
+    prior = 1.0 / (1.0 + ranks)
+    return tf + coverage + 0.5 * prior, coverage > 0
+
+def pack_context(query: str, mode: str, hits: List[Dict[str, Any]], texts: Dict[int, str],
+                 budget_chars: int) -> PackedContext:
+    """按得分从高到低挑句子，直到字符预算用完；不再整块塞 chunk。"""
+    sources = [
+        Source(i, h["chunk_id"], h["path"], h["heading"], h["start"], h["end"])
+        for i, h in enumerate(hits, start=1)
+    ]
+    sents: List[str] = []
+    owner: List[Tuple[int, int]] = []   # (source 下标, 句子序号)
+    for si, s in enumerate(sources):
+        for j, t in enumerate(split_sentences(texts.get(s.chunk_id, ""))):
+            sents.append(t)
+            owner.append((si, j))
+
+    ranks = np.array([o[0] for o in owner], dtype=np.float64)
+    scores, matched = score_sentences(sents, query_terms(query), ranks)
+    # 有句子命中查询词时，只在命中的句子里挑；一个都没命中才退回按名次先验
+    if matched.any():
+        scores = np.where(matched, scores, -np.inf)
+
+    used = 0
+    for k in np.argsort(-scores, kind="stable"):
+        if scores[k] == -np.inf:
+            break
+        n = len(sents[k]) + 1
+        if used + n > budget_chars:
+            continue
+        si, j = owner[k]
+        sources[si].sentences.append((j, sents[k]))
+        used += n
+    return PackedContext(query, mode, sources)
+
+class Answerer:
+    """
+    IAnswerer 实现：answer() 是生成器，拿到一段就 yield 一段，CLI 边收边打印。
+    无 LLM：抽取式输出（按 mode 排版选中的句子）；有 LLM：流式转发模型输出。
+    """
+    def __init__(self, retriever: IRetriever, backend: Optional[ILLMBackend] = None,
+                 context_chars: int = 3000):
+        self.retriever = retriever
+        self.backend = backend
+        self.context_chars = context_chars
+
+    def pack(self, query: str, mode: str = "summary", topk: int = 8) -> PackedContext:
+        if mode not in MODES:
+            raise RuntimeError(f"unknown mode: {mode} (choose from {'/'.join(MODES)})")
+        expr = match_expr(query)
+        hits = self.retriever.retrieve(expr, topk=topk) if expr else []
+        texts = get_chunk_texts([h["chunk_id"] for h in hits])
+        return pack_context(query, mode, hits, texts, self.context_chars)
+
+    def answer(self, query: str, mode: str = "summary", topk: int = 8) -> Iterator[str]:
+        ctx = self.pack(query, mode, topk)
+        used = [s for s in ctx.sources if s.sentences]
+        if not used:
+            yield "No hits.\n"
+            return
+
+        body = self._extractive(ctx, used) if self.backend is None else self._generate(ctx, used)
+        yield from _with_header(_HEADERS[ctx.mode], body)
+
+        yield "\n## 引用\n"
+        for s in used:
+            heading = f"  {s.heading}" if s.heading else ""
+            yield f"[{s.cite}] {s.path}#L{s.start}-L{s.end}{heading}  (chunk_id={s.chunk_id})\n"
+
+    def _extractive(self, ctx: PackedContext, used: List[Source]) -> Iterator[str]:
+        if ctx.mode == "summary":
+            for s in used:
+                for _, t in sorted(s.sentences):
+                    yield f"- {t} [{s.cite}]\n"
+        elif ctx.mode == "steps":
+            n = 0
+            for s in used:
+                for _, t in sorted(s.sentences):
+                    n += 1
+                    yield f"{n}. {t} [{s.cite}]\n"
+        else:
+            for s in used:
+                body = "".join(f"- {t}\n" for _, t in sorted(s.sentences))
+                yield f"### [{s.cite}] {s.path}{' > ' + s.heading if s.heading else ''}\n{body}"
+
+    def _prompt(self, ctx: PackedContext, context: str) -> str:
+        return f"{_PROMPTS[ctx.mode]}\n\n问题：{ctx.query}\n\n资料：\n{context}"
+
+    def _generate(self, ctx: PackedContext, used: List[Source]) -> Iterator[str]:
+        if ctx.mode != "compare":
+            yield from self.backend.stream(self._prompt(ctx, ctx.render()))
+            yield "\n"
+            return
+
+        # compare：每份资料一个请求，并发发出，谁先回来先输出谁
+        prompts = [
+            self._prompt(ctx, PackedContext(ctx.query, ctx.mode, [s]).render())
+            for s in used
+        ]
+        for i, text in self.backend.iter_completed(prompts):
+            s = used[i]
+            yield f"### [{s.cite}] {s.path}{' > ' + s.heading if s.heading else ''}\n{text.strip()}\n"
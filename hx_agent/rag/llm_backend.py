@@ -0,0 +1,136 @@
+# LLM 后端：OpenAI 兼容的 chat/completions 接口 + 按打包上下文 hash 的响应缓存
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import urllib.request
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from hx_agent.core.config import LLMConfig
+
+def prompt_key(prompt: str, model: str) -> str:
+    """缓存 key：打包后的完整 prompt（含上下文）+ 模型名"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """cache/llm/<key[:2]>/<key>.txt，一次写完再 rename，读到的总是完整响应"""
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        p = self._path(key)
+        return p.read_text(encoding="utf-8") if p.exists() else None
+
+    def put(self, key: str, text: str) -> None:
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, p)
+
+class OpenAICompatBackend:
+    """
+    ILLMBackend 实现（只用标准库）：
+    - stream()：SSE 流式读取，边收边 yield，给 CLI 直接输出
+    - complete()/complete_many()：asyncio 并发（线程池跑阻塞 IO，信号量限并发）
+    命中缓存时不发请求。
+    """
+    def __init__(self, cfg: LLMConfig, cache: Optional[ResponseCache] = None):
+        self.cfg = cfg
+        self.cache = cache
+        self._api_key = os.environ.get(cfg.api_key_env, "")
+
+    def _request(self, prompt: str, stream: bool) -> urllib.request.Request:
+        body = {
+            "model": self.cfg.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+        headers = {"Content-Type": "application/json"}
+        if self._api_key:
+            headers["Authorization"] = f"Bearer {self._api_key}"
+        return urllib.request.Request(
+            self.cfg.base_url.rstrip("/") + "/chat/completions",
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers=headers,
+            method="POST",
+        )
+
+    def _post(self, prompt: str) -> str:
+        with urllib.request.urlopen(self._request(prompt, stream=False), timeout=self.cfg.timeout_s) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+        return data["choices"][0]["message"]["content"]
+
+    def _cached(self, prompt: str):
+        key = prompt_key(prompt, self.cfg.model)
+        return key, (self.cache.get(key) if self.cache else None)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        key, hit = self._cached(prompt)
+        if hit is not None:
+            yield hit
+            return
+
+        parts: List[str] = []
+        with urllib.request.urlopen(self._request(prompt, stream=True), timeout=self.cfg.timeout_s) as resp:
+            for raw in resp:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        if self.cache:
+            self.cache.put(key, "".join(parts))
+
+    async def complete(self, prompt: str) -> str:
+        key, hit = self._cached(prompt)
+        if hit is not None:
+            return hit
+        text = await asyncio.to_thread(self._post, prompt)
+        if self.cache:
+            self.cache.put(key, text)
+        return text
+
+    def _limited(self, prompts: Sequence[str]):
+        """每个 prompt 一个协程，共用一个信号量限制并发"""
+        sem = asyncio.Semaphore(max(1, self.cfg.max_concurrency))
+
+        async def one(i: int, p: str) -> Tuple[int, str]:
+            async with sem:
+                return i, await self.complete(p)
+
+        return [one(i, p) for i, p in enumerate(prompts)]
+
+    async def complete_many(self, prompts: Sequence[str]) -> List[str]:
+        done = await asyncio.gather(*self._limited(prompts))
+        return [text for _, text in sorted(done)]
+
+    def iter_completed(self, prompts: Sequence[str]) -> Iterator[Tuple[int, str]]:
+        """同步调用方用：并发发出请求，按完成顺序 yield (下标, 响应)"""
+        loop = asyncio.new_event_loop()
+        pending = {loop.create_task(c) for c in self._limited(prompts)}
+        try:
+            while pending:
+                done, pending = loop.run_until_complete(
+                    asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                )
+                for t in done:
+                    yield t.result()
+        finally:
+            # 调用方提前停止迭代时，取消没跑完的请求
+            for t in pending:
+                t.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
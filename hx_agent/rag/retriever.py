@@ -0,0 +1,28 @@
+# 检索模块：FTS 召回 + 近重复折叠
+
+from __future__ import annotations
+from typing import Any, Dict, List
+
+from hx_agent.index.meta_store import search_fts
+from hx_agent.index.near_dup import collapse_near_dups
+
+# 折叠近重复会吃掉一部分命中，多召回几倍再截断到 topk
+OVERFETCH = 3
+
+def retrieve(query: str, topk: int = 10, dedup: bool = True) -> List[Dict[str, Any]]:
+    """
+    返回: search_fts 的命中列表；dedup 时近重复命中折叠进代表条目的 'dups' 字段，
+    不再占用 topk 名额。
+    """
+    if not dedup:
+        return search_fts(query, topk=topk)
+    rows = search_fts(query, topk=topk * OVERFETCH)
+    return collapse_near_dups(rows)[:topk]
+
+class FtsRetriever:
+    """IRetriever 的 FTS 实现"""
+    def __init__(self, dedup: bool = True):
+        self.dedup = dedup
+
+    def retrieve(self, query: str, topk: int = 10) -> List[Dict[str, Any]]:
+        return retrieve(query, topk=topk, dedup=self.dedup)
@@ -0,0 +1,56 @@
+"""
+ask 的首输出时间（time-to-first-output）与总耗时，按 mode 分别测。
+
+用法：python scripts/bench_ask.py "<query>" [--repeat 5] [--llm-url http://127.0.0.1:8765/v1]
+需要先 init-db + ingest。给了 --llm-url 时走 LLM 后端（可配合 scripts/llm_stub.py），
+第一次是冷请求，之后的重复命中响应缓存。
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from hx_agent.core.config import LLMConfig  # noqa: E402
+from hx_agent.rag.answerer import Answerer, MODES  # noqa: E402
+from hx_agent.rag.llm_backend import OpenAICompatBackend, ResponseCache  # noqa: E402
+from hx_agent.rag.retriever import FtsRetriever  # noqa: E402
+
+
+def run_once(answerer, query, mode, topk):
+    t0 = time.perf_counter()
+    ttfo = None
+    for _ in answerer.answer(query, mode=mode, topk=topk):
+        if ttfo is None:
+            ttfo = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    return (ttfo or total) * 1000, total * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("query")
+    ap.add_argument("--topk", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--llm-url", default="")
+    args = ap.parse_args()
+
+    backend = None
+    if args.llm_url:
+        cache = ResponseCache(Path(tempfile.mkdtemp(prefix="hx_llm_cache_")))
+        backend = OpenAICompatBackend(LLMConfig(base_url=args.llm_url), cache)
+    answerer = Answerer(FtsRetriever(), backend=backend)
+
+    print(f"{'mode':<8} {'ttfo_first':>10} {'ttfo_med':>9} {'total_med':>10}  (ms)")
+    for mode in MODES:
+        runs = [run_once(answerer, args.query, mode, args.topk) for _ in range(args.repeat)]
+        print(f"{mode:<8} {runs[0][0]:10.1f} {statistics.median(r[0] for r in runs):9.1f} "
+              f"{statistics.median(r[1] for r in runs):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
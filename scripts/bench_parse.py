@@ -0,0 +1,101 @@
+"""
+解析吞吐对比：旧的 regex 路径 vs normalizer + parser_md + chunker。
+
+用法：python scripts/bench_parse.py [目录，默认 data/] [--repeat N]
+旧路径 = read_text(errors="ignore") + 逐行 strip()/startswith 的 chunk（v0.1 的 md_v1 实现，原样保留在本脚本里做基线）。
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from hx_agent.ingest.scanner import iter_docs  # noqa: E402
+from hx_agent.ingest.normalizer import decode_bytes, normalize_text  # noqa: E402
+from hx_agent.ingest.chunker_md import chunk_markdown  # noqa: E402
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+
+
+def legacy_chunk(text: str):
+    """md_v1 的切块逻辑（基线）"""
+    lines = text.splitlines()
+    chunks = []
+    heading_stack = []
+    buf = []
+    buf_start = 1
+    in_code = False
+    fence = None
+
+    def flush(end_line):
+        nonlocal buf
+        if not buf:
+            return
+        content = "\n".join(buf).strip()
+        if content:
+            chunks.append((" > ".join(h for h in heading_stack if h), buf_start, end_line, content))
+        buf = []
+
+    for i, line in enumerate(lines, start=1):
+        if line.strip().startswith("```") or line.strip().startswith("~~~"):
+            mark = line.strip()[:3]
+            if not in_code:
+                in_code, fence = True, mark
+            elif fence == mark:
+                in_code, fence = False, None
+            buf.append(line)
+            continue
+        if not in_code:
+            m = _HEADING_RE.match(line)
+            if m:
+                flush(i - 1)
+                buf_start = i
+                idx = len(m.group(1)) - 1
+                while len(heading_stack) < 6:
+                    heading_stack.append("")
+                heading_stack[idx] = m.group(2).strip()
+                for j in range(idx + 1, 6):
+                    heading_stack[j] = ""
+                buf.append(line)
+                continue
+        buf.append(line)
+    flush(len(lines))
+    return chunks
+
+
+def bench(name, fn, blobs, repeat, total):
+    t0 = time.perf_counter()
+    n = 0
+    for _ in range(repeat):
+        for b in blobs:
+            n += len(fn(b))
+    dt = time.perf_counter() - t0
+    mb = total * repeat / (1024 * 1024)
+    print(f"{name:<12} {dt * 1000:8.1f} ms  {mb / dt:7.2f} MB/s  items/run={n // repeat}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", nargs="?", default=str(ROOT / "data"))
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    blobs = [p.read_bytes() for p in iter_docs(Path(args.path))]
+    if not blobs:
+        print(f"no docs under {args.path}")
+        return
+    total = sum(len(b) for b in blobs)
+    print(f"files={len(blobs)} bytes={total} repeat={args.repeat}")
+
+    texts = [normalize_text(decode_bytes(b)) for b in blobs]
+    bench("legacy", lambda b: legacy_chunk(b.decode("utf-8", errors="ignore")), blobs, args.repeat, total)
+    bench("normalize", lambda b: normalize_text(decode_bytes(b)), blobs, args.repeat, total)
+    bench("parse+chunk", chunk_markdown, texts, args.repeat, total)
+    bench("new", lambda b: chunk_markdown(normalize_text(decode_bytes(b))), blobs, args.repeat, total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+本地 LLM 桩服务（OpenAI 兼容 /v1/chat/completions），用于 ask --llm 的联调和计时。
+
+用法：python scripts/llm_stub.py [--port 8765] [--delay-ms 20]
+然后在 hx_agent.json 里设置 "llm": {"base_url": "http://127.0.0.1:8765/v1"}。
+回答内容是对 prompt 的确定性回显（前几行资料 + 引用编号），按词分片流式返回。
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_CITE_RE = re.compile(r"^\[(\d+)\]", re.M)
+
+
+def fake_answer(prompt: str) -> str:
+    cites = _CITE_RE.findall(prompt)
+    lines = [l for l in prompt.split("资料：", 1)[-1].splitlines() if l and not l.startswith("[")]
+    body = "\n".join(f"- {l[:60]} [{cites[0] if cites else 1}]" for l in lines[:3])
+    return f"(stub) 共 {len(cites)} 份资料。\n{body}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def delay_for(self, prompt: str) -> float:
+        """首 token 延迟；测试里按 prompt 覆盖，模拟快慢不一的请求"""
+        return self.delay
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(n).decode("utf-8"))
+        prompt = req["messages"][-1]["content"]
+        text = fake_answer(prompt)
+        delay = self.delay_for(prompt)
+        time.sleep(delay)  # 模拟首 token 延迟
+
+        if not req.get("stream"):
+            data = json.dumps({"choices": [{"message": {"role": "assistant", "content": text}}]},
+                              ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for piece in re.findall(r"\S+\s*", text):
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(delay / 10)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay-ms", type=int, default=20)
+    args = ap.parse_args()
+    Handler.delay = args.delay_ms / 1000.0
+    srv = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"llm stub on http://127.0.0.1:{args.port}/v1")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
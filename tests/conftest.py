@@ -0,0 +1,18 @@
+import sqlite3
+
+import pytest
+
+from hx_agent.config import settings
+from hx_agent.index import meta_store
+
+
+@pytest.fixture
+def kb(tmp_path):
+    """按 schema.sql 建一个临时库，connect() 指向它；用完切回默认库"""
+    db = tmp_path / "kb.sqlite"
+    with sqlite3.connect(db) as conn:
+        conn.executescript(settings.SCHEMA_SQL.read_text(encoding="utf-8"))
+        conn.execute("PRAGMA journal_mode = WAL;")  # 同 init-db
+    meta_store.use_db(db)
+    yield db
+    meta_store.use_db(settings.KB_DB)
@@ -0,0 +1,109 @@
+from typer.testing import CliRunner
+
+from hx_agent.cli import app
+from hx_agent.rag.answerer import Answerer, match_expr, pack_context
+
+
+class _Recorder:
+    def __init__(self):
+        self.queries = []
+
+    def retrieve(self, query, topk=10):
+        self.queries.append(query)
+        return []
+
+
+def test_match_expr_quotes_terms():
+    assert match_expr("how to use mutex?") == '"how" OR "to" OR "use" OR "mutex"'
+    assert match_expr("std::mutex 加锁") == '"std" OR "mutex" OR "加锁"*'
+    assert match_expr("什么是虚假唤醒？") == '"虚假唤醒"*'
+    assert match_expr("互斥锁怎么用") == '"互斥锁"*'
+    assert match_expr("锁是什么") == '"锁"*'
+    assert match_expr("?? -- **") == ""
+
+
+def test_pack_sends_match_expr_to_retriever():
+    rec = _Recorder()
+    Answerer(rec).pack("how to use mutex?")
+    assert rec.queries == ['"how" OR "to" OR "use" OR "mutex"']
+
+    rec = _Recorder()
+    assert Answerer(rec).pack("???").sources == []
+    assert rec.queries == []
+
+
+def test_ask_with_punctuation_hits_fts(kb, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "lock.md").write_text("# Lock\n\nUse a mutex to guard shared state.\n", encoding="utf-8")
+    (docs / "cv.md").write_text(
+        "# 条件变量\n\n虚假唤醒是操作系统调度的固有特性，要在循环里检查条件。\n\n互斥锁用于保护共享数据，先加锁再访问。\n",
+        encoding="utf-8",
+    )
+    runner = CliRunner()
+    assert runner.invoke(app, ["--db", str(kb), "ingest", str(docs)]).exit_code == 0
+
+    for query, expected in [
+        ("how to use mutex?", "guard shared state"),
+        ("虚假唤醒", "要在循环里检查条件"),
+        ("互斥锁怎么用？", "先加锁再访问"),
+    ]:
+        res = runner.invoke(app, ["--db", str(kb), "ask", query])
+        assert res.exit_code == 0, res.output
+        assert expected in res.output, (query, res.output)
+
+
+class _Hits:
+    def retrieve(self, query, topk=10):
+        return [
+            {"chunk_id": 1, "path": "a.md", "heading": "Lock", "start": 1, "end": 3},
+            {"chunk_id": 2, "path": "b.md", "heading": "", "start": 1, "end": 2},
+        ]
+
+
+class _ReversedBackend:
+    def stream(self, prompt):
+        yield "- streamed"
+        yield " answer"
+
+    def iter_completed(self, prompts):
+        for i in reversed(range(len(prompts))):
+            yield i, f"answer {i}"
+
+
+def test_mode_header_comes_with_first_content(monkeypatch):
+    texts = {1: "Use a mutex to guard shared state.", 2: "A mutex can deadlock if locked twice."}
+    monkeypatch.setattr("hx_agent.rag.answerer.get_chunk_texts", lambda ids: texts)
+
+    for mode, header in (("summary", "## 摘要\n- "), ("steps", "## 步骤\n1. "), ("compare", "## 对比\n### [1]")):
+        first = next(iter(Answerer(_Hits()).answer("mutex", mode=mode)))
+        assert first.startswith(header)
+
+    pieces = list(Answerer(_Hits(), backend=_ReversedBackend()).answer("mutex", mode="compare"))
+    assert pieces[0].startswith("## 对比\n### [2] b.md\nanswer 1")
+    assert "## 对比" not in "".join(pieces[1:])
+
+    for mode, header in (("summary", "## 摘要\n"), ("steps", "## 步骤\n")):
+        pieces = list(Answerer(_Hits(), backend=_ReversedBackend()).answer("mutex", mode=mode))
+        assert pieces[0] == header + "- streamed"
+        assert header not in "".join(pieces[1:])
+
+
+def test_pack_context_respects_budget():
+    hits = [{"chunk_id": i, "path": f"{i}.md", "heading": "", "start": 1, "end": 9} for i in range(5)]
+    texts = {
+        i: "\n".join(f"mutex 第{i}份资料的第{j}句，讲加锁顺序和死锁排查。" for j in range(20))
+        for i in range(5)
+    }
+    for budget in (0, 30, 200, 1000):
+        ctx = pack_context("mutex 死锁", "summary", hits, texts, budget)
+        used = sum(len(t) + 1 for s in ctx.sources for _, t in s.sentences)
+        assert used <= budget
+        if budget >= 200:
+            assert used > budget // 2
+
+    # 只挑命中查询词的句子
+    texts[0] += "\n这一句和问题完全无关，不该被选中。"
+    ctx = pack_context("mutex", "summary", hits, texts, 10_000)
+    picked = [t for s in ctx.sources for _, t in s.sentences]
+    assert picked and all("mutex" in t for t in picked)
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from hx_agent.cli import app
+from hx_agent.config import settings
+from hx_agent.index import meta_store
+
+runner = CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def _restore_db():
+    # --db 会切换 meta_store 的模块级状态，测完切回默认库
+    yield
+    meta_store.use_db(settings.KB_DB)
+
+
+def test_init_db_and_doctor_use_selected_db(tmp_path):
+    db = tmp_path / "other.sqlite"
+    res = runner.invoke(app, ["--db", str(db), "init-db"])
+    assert res.exit_code == 0, res.output
+    assert str(db) in res.output
+    with sqlite3.connect(db) as conn:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert {"files", "chunks", "chunks_fts", "chunk_sig", "file_runs"} <= tables
+    assert journal == "wal"
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("# A\n\nmutex 保护共享数据。\n", encoding="utf-8")
+    assert runner.invoke(app, ["--db", str(db), "ingest", str(docs)]).exit_code == 0
+    res = runner.invoke(app, ["--db", str(db), "doctor"])
+    assert res.exit_code == 0, res.output
+    assert "FILES: 1" in res.output
+
+
+def test_readonly_rejects_live_db(kb):
+    res = runner.invoke(app, ["--readonly", "search", "mutex"])
+    assert res.exit_code != 0
+    assert isinstance(res.exception, RuntimeError)
+
+    res = runner.invoke(app, ["--readonly", "--db", str(settings.KB_DB), "search", "mutex"])
+    assert isinstance(res.exception, RuntimeError)
+
+    res = runner.invoke(app, ["--readonly", "--db", str(kb), "search", "mutex"])
+    assert res.exit_code == 0, res.output
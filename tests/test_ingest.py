@@ -0,0 +1,68 @@
+import sqlite3
+
+from typer.testing import CliRunner
+
+from hx_agent.cli import app
+from hx_agent.config import settings
+
+runner = CliRunner()
+
+
+def _ingest(kb, docs):
+    res = runner.invoke(app, ["--db", str(kb), "ingest", str(docs)])
+    assert res.exit_code == 0, res.output
+    return res.output
+
+
+def _docs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("# 锁\n\nmutex 保护共享数据。\n\n## 用法\n\n先 lock 再 unlock。\n", encoding="utf-8")
+    return docs
+
+
+def test_policy_version_change_rebuilds_unchanged_files(kb, tmp_path):
+    docs = _docs(tmp_path)
+    assert "rebuilt_files=1" in _ingest(kb, docs)
+    assert "rebuilt_files=0" in _ingest(kb, docs)
+
+    with sqlite3.connect(kb) as conn:
+        conn.execute("UPDATE chunks SET chunk_policy_version='md_v1'")
+    assert "rebuilt_files=1" in _ingest(kb, docs)
+    with sqlite3.connect(kb) as conn:
+        versions = {r[0] for r in conn.execute("SELECT chunk_policy_version FROM chunks")}
+    assert versions == {settings.CHUNK_POLICY_VERSION}
+
+
+def test_missing_signatures_are_backfilled(kb, tmp_path):
+    docs = _docs(tmp_path)
+    _ingest(kb, docs)
+    with sqlite3.connect(kb) as conn:
+        (chunks,) = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        # 模拟升级前的老库：签名表刚由 init-db 建出来，还是空的
+        conn.execute("DELETE FROM chunk_lsh")
+        conn.execute("DELETE FROM chunk_sig")
+
+    assert "rebuilt_files=1" in _ingest(kb, docs)
+    with sqlite3.connect(kb) as conn:
+        (sigs,) = conn.execute("SELECT COUNT(*) FROM chunk_sig").fetchone()
+        (lsh,) = conn.execute("SELECT COUNT(*) FROM chunk_lsh").fetchone()
+    assert sigs == chunks
+    assert lsh == 4 * chunks
+    assert "rebuilt_files=0" in _ingest(kb, docs)
+
+
+def test_reingest_changed_file_keeps_fts_consistent(kb, tmp_path):
+    docs = _docs(tmp_path)
+    _ingest(kb, docs)
+    (docs / "a.md").write_text("# 锁\n\nsemaphore 控制并发数。\n", encoding="utf-8")
+    assert "rebuilt_files=1" in _ingest(kb, docs)
+
+    with sqlite3.connect(kb) as conn:
+        conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES('integrity-check')")
+        (chunks,) = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        (fts,) = conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()
+        (old,) = conn.execute("SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'mutex'").fetchone()
+        (new,) = conn.execute("SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH 'semaphore'").fetchone()
+    assert fts == chunks
+    assert (old, new) == (0, 1)
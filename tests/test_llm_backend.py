@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from hx_agent.core.config import LLMConfig
+from hx_agent.rag.llm_backend import OpenAICompatBackend, ResponseCache
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from llm_stub import Handler, fake_answer  # noqa: E402
+
+
+class _Stub(Handler):
+    """记下收到的 prompt；delays 按 prompt 指定首 token 延迟"""
+    delays = {}
+    seen = []
+
+    def delay_for(self, prompt):
+        type(self).seen.append(prompt)
+        return self.delays.get(prompt, 0.0)
+
+
+@pytest.fixture
+def stub():
+    _Stub.delays = {}
+    _Stub.seen = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield _Stub, f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _backend(url, tmp_path, **kw):
+    cfg = LLMConfig(base_url=url, timeout_s=10.0, **kw)
+    return OpenAICompatBackend(cfg, ResponseCache(tmp_path / "llm"))
+
+
+PROMPT = "问题：mutex\n\n资料：\n[1] a.md Lock\nUse a mutex to guard shared state.\n"
+
+
+def test_stream_then_cache_hit(stub, tmp_path):
+    handler, url = stub
+    backend = _backend(url, tmp_path)
+
+    pieces = list(backend.stream(PROMPT))
+    assert len(pieces) > 1
+    assert "".join(pieces) == fake_answer(PROMPT)
+    assert len(handler.seen) == 1
+
+    # 第二次命中缓存：整段一次给出，不再发请求
+    assert list(backend.stream(PROMPT)) == [fake_answer(PROMPT)]
+    assert len(handler.seen) == 1
+
+
+def test_iter_completed_yields_in_completion_order(stub, tmp_path):
+    handler, url = stub
+    prompts = [f"slow {PROMPT}", f"fast {PROMPT}", f"mid {PROMPT}"]
+    handler.delays = {prompts[0]: 0.3, prompts[1]: 0.0, prompts[2]: 0.15}
+    backend = _backend(url, tmp_path)
+
+    got = list(backend.iter_completed(prompts))
+    assert [i for i, _ in got] == [1, 2, 0]
+    assert all(text == fake_answer(prompts[i]) for i, text in got)
+
+
+def test_iter_completed_cancels_pending_on_close(stub, tmp_path):
+    handler, url = stub
+    prompts = [f"a {PROMPT}", f"b {PROMPT}", f"c {PROMPT}"]
+    handler.delays = {prompts[1]: 1.0}
+    backend = _backend(url, tmp_path, max_concurrency=1)
+
+    it = backend.iter_completed(prompts)
+    assert next(it) == (0, fake_answer(prompts[0]))
+    started = time.perf_counter()
+    it.close()
+    # 不等还在路上的请求跑完；排在信号量后面的请求不会再发出去
+    assert time.perf_counter() - started < 0.5
+    time.sleep(0.3)
+    assert handler.seen == prompts[:2]
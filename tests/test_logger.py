@@ -0,0 +1,116 @@
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import pytest
+
+from hx_agent.core import logger as logmod
+from hx_agent.core.logger import LoggerOptions, ProgressReporter, create_logger, flush_logs
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Collect:
+    def __init__(self):
+        self.lines = []
+
+    def info(self, msg, *args):
+        self.lines.append(msg % args)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(logmod.time, "monotonic", c)
+    return c
+
+
+@pytest.fixture
+def fresh_logger(request):
+    """每个测试一个独立的 logger 名字，测完摘掉 handler"""
+    name = f"hx_test_{request.node.name}"
+    yield name
+    for n in (name, f"{name}.events"):
+        lg = logging.getLogger(n)
+        for h in list(lg.handlers):
+            lg.removeHandler(h)
+            h.close()
+
+
+def test_progress_is_rate_limited(clock):
+    log = _Collect()
+    p = ProgressReporter(log, total=100, label="ingest", interval=2.0)
+    for _ in range(50):
+        clock.now += 0.01
+        p.update(1, 1024)
+    assert log.lines == []
+
+    clock.now += 2.0
+    p.update(1, 1024)
+    assert len(log.lines) == 1
+    p.update(1, 1024)
+    assert len(log.lines) == 1
+
+
+def test_progress_eta(clock):
+    p = ProgressReporter(_Collect(), total=10, interval=60.0)
+    clock.now += 2.0
+    p.update(4, 4 * 1024 * 1024)
+    s = p.summary()
+    assert "files=4/10" in s
+    assert "2.0 files/s" in s
+    assert "2.00 MB/s" in s
+    assert "eta=3.0s" in s
+
+
+def test_event_writes_jsonl(tmp_path, fresh_logger):
+    opt = LoggerOptions(name=fresh_logger, to_console=False, to_file=False, async_mode=False,
+                        events_to_file=True, events_file=Path("events.jsonl"))
+    log = create_logger(opt, repo_root=tmp_path)
+    log.event("ingest.file", path="a.md", changed=True, chunks=3)
+    log.event("ingest.file", path="b.md", changed=False)
+
+    rows = [json.loads(l) for l in (tmp_path / "events.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [r["path"] for r in rows] == ["a.md", "b.md"]
+    assert rows[0]["event"] == "ingest.file" and rows[0]["chunks"] == 3
+    assert isinstance(logging.getLogger(f"{fresh_logger}.events").handlers[0], RotatingFileHandler)
+
+
+def test_event_falls_back_to_debug(tmp_path, fresh_logger, caplog):
+    opt = LoggerOptions(name=fresh_logger, level="INFO", to_console=False, to_file=False, async_mode=False)
+    log = create_logger(opt, repo_root=tmp_path)
+
+    with caplog.at_level(logging.INFO, logger=fresh_logger):
+        log.event("ingest.file", path="a.md")
+    assert caplog.records == []
+
+    with caplog.at_level(logging.DEBUG, logger=fresh_logger):
+        log.event("ingest.file", path="a.md")
+    assert [r.levelno for r in caplog.records] == [logging.DEBUG]
+    assert "ingest.file" in caplog.records[0].getMessage()
+
+
+def test_queue_mode_flushes_everything(tmp_path, fresh_logger):
+    opt = LoggerOptions(name=fresh_logger, to_console=False, to_file=True, file=Path("hx.log"),
+                        async_mode=True, events_to_file=True, events_file=Path("events.jsonl"))
+    log = create_logger(opt, repo_root=tmp_path)
+    for i in range(1000):
+        log.info("line %d", i)
+        log.event("tick", i=i)
+    flush_logs()
+
+    lines = (tmp_path / "hx.log").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1000 and lines[-1].endswith("line 999")
+    assert len((tmp_path / "events.jsonl").read_text(encoding="utf-8").splitlines()) == 1000
+
+    # flush 之后后台线程照常工作
+    log.info("after flush")
+    flush_logs()
+    assert (tmp_path / "hx.log").read_text(encoding="utf-8").splitlines()[-1].endswith("after flush")
@@ -0,0 +1,84 @@
+import random
+
+from hx_agent.index import meta_store
+from hx_agent.index.near_dup import (
+    MAX_HAMMING,
+    bucket_pairs,
+    cluster_pairs,
+    collapse_near_dups,
+    hamming,
+    simhash_batch,
+)
+
+BASE = "条件变量等待时要在 while 循环里检查谓词，防止虚假唤醒导致线程在条件不满足时继续执行。" * 3
+
+
+def _words(seed, n=60):
+    rnd = random.Random(seed)
+    return " ".join(rnd.choice(["mutex", "lock", "thread", "queue", "atomic", "fence", "wait"]) + str(rnd.randint(0, 99))
+                    for _ in range(n))
+
+
+def test_simhash_batch_is_stable_and_signed():
+    a, b = simhash_batch([BASE, BASE])
+    assert a == b
+    assert simhash_batch([BASE]) == [a]      # 与批内位置无关
+    assert -(1 << 63) <= a < (1 << 63)
+    assert simhash_batch([]) == []
+    assert simhash_batch(["", "   "]) == [0, 0]
+    assert simhash_batch(["ab"])[0] != 0
+
+
+def test_simhash_distance_tracks_similarity():
+    near = BASE.replace("继续执行", "继续运行", 1)
+    spaced = BASE.replace("，", " ， ")     # 空白不参与 shingle
+    a, b, c, d = simhash_batch([BASE, near, _words(1), spaced])
+    assert hamming(a, b) <= MAX_HAMMING
+    assert hamming(a, d) == 0
+    assert hamming(a, c) > 10
+
+
+def test_collapse_near_dups_keeps_first_and_attaches_rest():
+    near = BASE.replace("继续执行", "继续运行", 1)
+    s = simhash_batch([BASE, near, _words(2)])
+    hits = [
+        {"chunk_id": 1, "simhash": s[0]},
+        {"chunk_id": 2, "simhash": s[2]},
+        {"chunk_id": 3, "simhash": s[1]},
+        {"chunk_id": 4, "simhash": None},
+        {"chunk_id": 5, "simhash": s[0]},
+    ]
+    out = collapse_near_dups(hits)
+    assert [h["chunk_id"] for h in out] == [1, 2, 4]
+    assert [d["chunk_id"] for d in out[0]["dups"]] == [3, 5]
+    assert "dups" not in out[1]
+
+
+def test_cluster_pairs_union_find():
+    clusters = cluster_pairs([1, 2, 3, 4, 5, 6, 7], [(1, 2), (2, 3), (5, 6), (3, 1)])
+    assert clusters == [[1, 2, 3], [5, 6]]
+    assert cluster_pairs([1, 2], []) == []
+
+
+def test_bucket_pairs_oversized_bucket_uses_representative():
+    sig = {i: 0 for i in range(10)}
+    sig[9] = (1 << 40) - 1                  # 与其余差很远
+    full = bucket_pairs([list(range(10))], sig, max_bucket=20)
+    assert len(full) == 9 * 8 // 2
+    capped = bucket_pairs([list(range(10))], sig, max_bucket=3)
+    assert capped == {(0, i) for i in range(1, 9)}
+    assert cluster_pairs(list(range(10)), capped) == [list(range(9))]
+
+
+def test_near_dup_clusters_keeps_big_exact_cluster(kb):
+    template = "## 模板\n\n" + BASE
+    pair = _words(3)
+    chunks = [{"heading": "t", "start_line": i, "end_line": i, "text": template} for i in range(250)]
+    chunks += [{"heading": "p", "start_line": 900 + i, "end_line": 900 + i, "text": pair} for i in range(2)]
+    chunks += [{"heading": "u", "start_line": 990, "end_line": 990, "text": _words(4)}]
+    fid, _ = meta_store.upsert_file_return_id(path="t.md", mtime=0, sha256="x", size=1, ftype="md")
+    meta_store.insert_chunks_and_fts(fid, "t.md", "md_v2", chunks)
+
+    clusters = meta_store.near_dup_clusters(limit=10, max_bucket=200)
+    assert [len(c) for c in clusters] == [250, 2]
+    assert {m["start"] for m in clusters[1]} == {900, 901}
@@ -0,0 +1,92 @@
+import codecs
+
+from hx_agent.ingest.normalizer import decode_bytes, normalize_text
+from hx_agent.ingest.parser_md import BLANK, CODE, HEADING, LIST, PARAGRAPH, TABLE, parse_blocks
+
+
+def test_decode_bytes_boms():
+    text = "# 锁\n互斥\n"
+    assert decode_bytes(codecs.BOM_UTF8 + text.encode("utf-8")) == text
+    assert decode_bytes(codecs.BOM_UTF16_LE + text.encode("utf-16-le")) == text
+    assert decode_bytes(codecs.BOM_UTF16_BE + text.encode("utf-16-be")) == text
+    assert decode_bytes(codecs.BOM_UTF32_LE + text.encode("utf-32-le")) == text
+
+
+def test_decode_bytes_fallbacks():
+    text = "# 条件变量\n虚假唤醒要用 while 判断。\n"
+    assert decode_bytes(text.encode("utf-8")) == text
+    assert decode_bytes(text.encode("gb18030")) == text
+    # 都解不了就替换非法字节，不抛异常
+    assert "�" in decode_bytes(b"ok \xff\xfe\xfd" + "锁".encode("utf-16-le") + b"\x80")
+
+
+def test_normalize_strips_tags_outside_code_only():
+    text = (
+        '## <span style="color:red">标题</span>\r\n'
+        "正文 <font color=#333>说明</font> a​b   \r\n"
+        "```cpp\r\n"
+        "#include <mutex>\r\n"
+        'auto s = "<span>keep</span>";  \r\n'
+        "```\r\n"
+        "<b>粗体</b> 与 vector<int>\r\n"
+        "~~~\n<i>keep</i>\n~~~\n"
+    )
+    out = normalize_text(text)
+    assert out.split("\n") == [
+        "## 标题",
+        "正文 说明 ab",
+        "```cpp",
+        "#include <mutex>",
+        'auto s = "<span>keep</span>";',
+        "```",
+        "粗体 与 vector<int>",
+        "~~~",
+        "<i>keep</i>",
+        "~~~",
+        "",
+    ]
+
+
+def test_normalize_preserves_line_count():
+    text = "a\r\nb\rc\n\n  \n<span>x</span>\n```\n<b>\n"   # 未闭合的代码块到文末
+    out = normalize_text(text)
+    assert len(out.split("\n")) == len(text.replace("\r\n", "\n").replace("\r", "\n").split("\n"))
+    assert out.endswith("```\n<b>\n")
+
+
+def test_parse_blocks_kinds_and_lines():
+    text = "\n".join([
+        "# Title",            # 1
+        "",                   # 2
+        "para one",           # 3
+        "para two",           # 4
+        "- item",             # 5
+        "  continued",        # 6
+        "1. next",            # 7
+        "| a | b |",          # 8
+        "|---|---|",          # 9
+        "```",                # 10
+        "# not a heading",    # 11
+        "```",                # 12
+        "#no-space",          # 13
+        "## Sub",             # 14
+    ])
+    blocks = list(parse_blocks(text))
+    assert [(b.kind, b.start_line, b.end_line) for b in blocks] == [
+        (HEADING, 1, 1),
+        (BLANK, 2, 2),
+        (PARAGRAPH, 3, 4),
+        (LIST, 5, 7),
+        (TABLE, 8, 9),
+        (CODE, 10, 12),
+        (PARAGRAPH, 13, 13),
+        (HEADING, 14, 14),
+    ]
+    assert (blocks[0].level, blocks[0].title) == (1, "Title")
+    assert (blocks[-1].level, blocks[-1].title) == (2, "Sub")
+    assert blocks[5].lines == ["```", "# not a heading", "```"]
+
+
+def test_parse_blocks_unclosed_fence_runs_to_end():
+    blocks = list(parse_blocks("text\n~~~\ncode\n# still code"))
+    assert [(b.kind, b.start_line, b.end_line) for b in blocks] == [(PARAGRAPH, 1, 1), (CODE, 2, 4)]
@@ -0,0 +1,79 @@
+import tracemalloc
+from pathlib import Path
+
+from hx_agent.format.reformatter import reformat_file, reformat_path
+
+
+def _run(src: Path, tmp_path: Path):
+    return reformat_path(src, template="sop", out_dir=tmp_path / "out", cache_dir=tmp_path / "cache", workers=1)
+
+
+def test_cache_hit_requires_current_source(tmp_path):
+    src = tmp_path / "a.md"
+    src.write_text("# A\n\nversion one\n", encoding="utf-8")
+    [r1] = _run(src, tmp_path)
+    assert not r1.cached
+
+    src.write_text("# A\n\nversion two\n", encoding="utf-8")
+    [r2] = _run(src, tmp_path)
+    assert not r2.cached
+
+    # 改回 v1：旧 v1 标记不能再被当成命中，输出必须回到 v1
+    src.write_text("# A\n\nversion one\n", encoding="utf-8")
+    [r3] = _run(src, tmp_path)
+    assert not r3.cached
+    assert "version one" in r3.out.read_text(encoding="utf-8")
+
+    [r4] = _run(src, tmp_path)
+    assert r4.cached
+
+
+def test_identical_sources_keep_separate_outputs(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "a.md").write_text("# same\n\nbody\n", encoding="utf-8")
+    (notes / "b.md").write_text("# same\n\nbody\n", encoding="utf-8")
+    first = _run(notes, tmp_path)
+    assert [r.cached for r in first] == [False, False]
+
+    (notes / "b.md").unlink()
+    (tmp_path / "out" / "b.sop.md").unlink()
+    (notes / "b.md").write_text("# same\n\nbody\n", encoding="utf-8")
+    again = {r.src.name: r.cached for r in _run(notes, tmp_path)}
+    assert again == {"a.md": True, "b.md": False}
+    assert (tmp_path / "out" / "b.sop.md").exists()
+
+
+def test_outputs_inside_source_dir_are_not_reformatted(tmp_path):
+    (tmp_path / "a.md").write_text("# A\n\nbody\n", encoding="utf-8")
+    out = tmp_path / "out"
+    first = reformat_path(tmp_path, template="sop", out_dir=out, cache_dir=tmp_path / "cache", workers=1)
+    assert [r.src.name for r in first] == ["a.md"]
+
+    again = reformat_path(tmp_path, template="sop", out_dir=out, cache_dir=tmp_path / "cache", workers=1)
+    assert [(r.src.name, r.cached) for r in again] == [("a.md", True)]
+    assert sorted(p.name for p in out.rglob("*.md")) == ["a.sop.md"]
+
+
+def test_large_section_is_streamed(tmp_path):
+    src = tmp_path / "big.md"
+    line = "执行一步操作并记录输出结果，确认没有报错。\n"
+    n = 200_000
+    with src.open("w", encoding="utf-8") as f:
+        f.write("# 大文件\n\n## 步骤\n\n")
+        for _ in range(n):
+            f.write(line)
+        f.write("\n## 参考\n\n- link\n")
+
+    tracemalloc.start()
+    out = reformat_file(src, "sop", tmp_path / "big.sop.md")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = src.stat().st_size
+    assert peak < size / 4
+    text = out.read_text(encoding="utf-8")
+    head = text.split("## 原始记录", 1)[0]
+    assert head.count(line) == n
+    assert "## 验证\n（待补充）" in head
+    assert "## 参考\n- link\n" in head
@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+
+from typer.testing import CliRunner
+
+import hx_agent.cli as cli
+from hx_agent.cli import app
+from hx_agent.index.snapshot import MAX_RESTARTS, snapshot_full
+
+runner = CliRunner()
+
+
+def test_full_snapshot_finishes_under_constant_writes(kb, tmp_path):
+    with sqlite3.connect(kb) as conn:
+        conn.executemany(
+            "INSERT INTO runs(started_at, chunk_policy_version, notes) VALUES(datetime('now'), 'md_v2', ?)",
+            [("x" * 2000,) for _ in range(200)],
+        )
+
+    stop = threading.Event()
+
+    def writer():
+        # 模拟 ingest：不停地提交小事务，每次提交都会让分页备份从头再来
+        conn = sqlite3.connect(kb, timeout=30)
+        deadline = time.monotonic() + 20
+        while not stop.is_set() and time.monotonic() < deadline:
+            conn.execute("UPDATE runs SET notes = hex(randomblob(1000)) WHERE id = 1")
+            conn.commit()
+            time.sleep(0.001)
+        conn.close()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        started = time.monotonic()
+        r = snapshot_full(tmp_path / "replica.sqlite", pages=1, pause=0.001)
+        elapsed = time.monotonic() - started
+    finally:
+        stop.set()
+        t.join()
+
+    assert elapsed < 10
+    assert r.restarts > MAX_RESTARTS
+    with sqlite3.connect(r.dest) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 200
+
+
+def _cli(kb, *args):
+    return runner.invoke(app, ["--db", str(kb), *args])
+
+
+def _replica_texts(path):
+    with sqlite3.connect(path) as conn:
+        return " ".join(r[0] for r in conn.execute("SELECT text FROM chunks"))
+
+
+def test_incremental_snapshot_picks_up_file_rebuilt_by_interrupted_ingest(kb, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    doc = docs / "a.md"
+    doc.write_text("# 锁\n\nmutex 保护共享数据。\n", encoding="utf-8")
+    replica = tmp_path / "replica.sqlite"
+    assert _cli(kb, "ingest", str(docs)).exit_code == 0
+    assert _cli(kb, "snapshot", str(replica)).exit_code == 0
+
+    # chunk 事务提交之后、ingest 结束之前被打断
+    real_insert = cli.insert_chunks_and_fts
+
+    def insert_then_die(**kw):
+        real_insert(**kw)
+        raise RuntimeError("interrupted")
+
+    doc.write_text("# 锁\n\nspinlock 保护共享数据。\n", encoding="utf-8")
+    monkeypatch.setattr(cli, "insert_chunks_and_fts", insert_then_die)
+    assert _cli(kb, "ingest", str(docs)).exit_code != 0
+    monkeypatch.undo()
+
+    # 文件 sha 已是新的，这次 ingest 会跳过它；增量快照只能靠 file_runs 找到它
+    res = _cli(kb, "ingest", str(docs))
+    assert "rebuilt_files=0" in res.output, res.output
+    res = _cli(kb, "snapshot", str(replica), "--incremental")
+    assert res.exit_code == 0, res.output
+    assert "files=1" in res.output
+    texts = _replica_texts(replica)
+    assert "spinlock" in texts and "mutex" not in texts
+
+    res = _cli(kb, "snapshot", str(replica), "--incremental")
+    assert "files=0" in res.output, res.output
+
+
+def test_single_step_fallback_does_not_lock_out_writer(kb, tmp_path):
+    # 库要大到 pages=-1 那一步拷上一阵子，写线程才会撞上它
+    with sqlite3.connect(kb) as conn:
+        conn.executemany(
+            "INSERT INTO runs(started_at, chunk_policy_version, notes) VALUES(datetime('now'), 'md_v2', hex(randomblob(?)))",
+            [(4000,) for _ in range(4000)],
+        )
+
+    stop = threading.Event()
+    errors, commits = [], []
+
+    def writer():
+        # timeout=0：只要被备份的读锁挡住就立刻报 database is locked
+        conn = sqlite3.connect(kb, timeout=0)
+        while not stop.is_set():
+            try:
+                conn.execute("UPDATE runs SET notes = hex(randomblob(100)) WHERE id = 1")
+                conn.commit()
+                commits.append(time.monotonic())
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                conn.rollback()
+            time.sleep(0.001)
+        conn.close()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        while not commits:
+            time.sleep(0.001)
+        r = snapshot_full(tmp_path / "replica.sqlite", pages=1, max_restarts=0)
+        done = time.monotonic()
+    finally:
+        stop.set()
+        t.join()
+
+    assert r.restarts == 1  # 走了 pages=-1
+    assert errors == []
+    assert any(c < done for c in commits[1:])
+    with sqlite3.connect(r.dest) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 4000